@@ -0,0 +1,376 @@
+"""
+Workforce analytics
+Loads salary, department, position, hire date and active flag into NumPy
+column arrays, rebuilt when the employees data version changes.
+
+Each grouping keeps a load-time ordering of the rows by (group, value). A
+request maps its filtered rows into that ordering once; counts, medians,
+percentiles, histogram bins and date ranges are then found with searchsorted
+over the selected positions instead of sorting per request.
+
+NumPy is optional: without it `available` is False and the API returns 503.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install numpy
+    np = None
+
+available = np is not None
+
+UNIX_EPOCH_JULIAN = 2440587.5
+EPOCH = date(1970, 1, 1)
+DAYS_PER_YEAR = 365.25
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+TENURE_EDGES = (1, 2, 5, 10, 20)        # years
+TENURE_LABELS = ('<1y', '1-2y', '2-5y', '5-10y', '10-20y', '20y+')
+
+class AnalyticsError(ValueError):
+    """Invalid analytics parameters"""
+
+def _encode(values):
+    """Dictionary-encode a text column: (int32 codes, sorted labels); NULL and '' share ''"""
+    distinct = set(values)
+    labels = sorted({v or '' for v in distinct})
+    position = {label: i for i, label in enumerate(labels)}
+    index = {v: position[v or ''] for v in distinct}
+    return np.fromiter(map(index.__getitem__, values), dtype=np.int32, count=len(values)), labels
+
+def _group_order(value_order, codes, groups):
+    """Stable re-sort of a value ordering by group code (radix sort for small codes)"""
+    dtype = np.uint8 if groups <= 1 << 8 else np.uint16 if groups <= 1 << 16 else np.int32
+    return value_order[np.argsort(codes[value_order].astype(dtype), kind='stable')]
+
+class SortedColumn:
+    """Row ordering by (group code, value), NaN values last within each group"""
+
+    def __init__(self, values, codes, groups, order):
+        self.order = order
+        self.values = values[order]
+        self.position_of = np.empty(len(self.order), dtype=np.int32)
+        self.position_of[self.order] = np.arange(len(self.order), dtype=np.int32)
+        counts = np.bincount(codes, minlength=groups)
+        valid = np.bincount(codes[~np.isnan(values)], minlength=groups)
+        self.starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        self.ends = self.starts + counts
+        self.valid_ends = self.starts + valid
+
+    def select(self, rows):
+        return Selection(self, rows)
+
+class RowFilter:
+    """A filter mask (None = all rows) plus the matching row ids when the filter is selective"""
+
+    def __init__(self, mask, size):
+        self.mask = mask
+        self.count = size if mask is None else int(np.count_nonzero(mask))
+        # Below ~half the rows, sorting the ids' positions beats gathering the whole mask
+        self.ids = np.flatnonzero(mask) if mask is not None and self.count * 2 < size else None
+
+class Selection:
+    """The rows of a SortedColumn passing a filter mask (all rows when mask is None)
+
+    Works in rank space: rank(i) is the number of selected rows before
+    position i of the ordering, so group bounds and value thresholds map to
+    selected-row ranges with one searchsorted.
+    """
+
+    def __init__(self, column, rows):
+        self.column = column
+        if rows.mask is None:
+            self.positions = None
+        elif rows.ids is not None:
+            self.positions = np.sort(column.position_of[rows.ids])
+        else:
+            self.positions = np.flatnonzero(rows.mask.take(column.order))
+        self._values = None
+
+    @property
+    def size(self):
+        return len(self.column.values) if self.positions is None else len(self.positions)
+
+    @property
+    def values(self):
+        """Selected values, in ordering order"""
+        if self._values is None:
+            self._values = self.column.values if self.positions is None else self.column.values[self.positions]
+        return self._values
+
+    def rank(self, index):
+        return index if self.positions is None else np.searchsorted(self.positions, index)
+
+    def kth(self, start, k):
+        """Values of the k-th selected rows (0-based) at or after ordering position start"""
+        return self.values[self.rank(start) + k]
+
+    def sums(self, starts, ends):
+        """Sum of selected values in each ordering range [start, end)"""
+        values = self.values
+        return np.array([values[lo:hi].sum() for lo, hi in zip(self.rank(starts), self.rank(ends))])
+
+    def percentiles(self, start, n, qs):
+        """numpy.percentile's linear interpolation over n selected sorted values"""
+        rank = np.asarray(qs, dtype=np.float64) / 100 * (n - 1)
+        lo = np.floor(rank).astype(np.int64)
+        hi = np.ceil(rank).astype(np.int64)
+        low, high = self.kth(start, lo), self.kth(start, hi)
+        return low + (high - low) * (rank - lo)
+
+    def below(self, thresholds, side='left'):
+        """Selected rows whose value is < (side='left') or <= (side='right') each threshold"""
+        return self.rank(np.searchsorted(self.column.values, thresholds, side=side))
+
+def _round(value):
+    return round(float(value), 2)
+
+class EmployeeColumns:
+    """Column arrays and orderings for one employees data version"""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.size = n = len(rows)
+        salaries, departments, positions, hire_days, active = (list(map(itemgetter(i), rows)) for i in range(5))
+
+        # NULL -> NaN; julianday() -> days since 1970-01-01 (NaN where hire_date is missing or invalid)
+        self.salary = np.array(salaries, dtype=np.float64)
+        self.hire_day = np.array(hire_days, dtype=np.float64) - UNIX_EPOCH_JULIAN
+        self.active = np.array(active, dtype=bool)
+        self.department, self.department_labels = _encode(departments)
+        self.position, self.position_labels = _encode(positions)
+
+        single = np.zeros(n, dtype=np.int32)
+        salary_order = np.argsort(self.salary, kind='stable')
+        departments, positions = len(self.department_labels), len(self.position_labels)
+        self.by_salary = SortedColumn(self.salary, single, 1, salary_order)
+        self.by_hire_day = SortedColumn(self.hire_day, single, 1, np.argsort(self.hire_day, kind='stable'))
+        self.by_department = SortedColumn(self.salary, self.department, departments,
+                                          _group_order(salary_order, self.department, departments))
+        self.by_position = SortedColumn(self.salary, self.position, positions,
+                                        _group_order(salary_order, self.position, positions))
+
+def _salary_summary(column, rows, bins):
+    sel = column.select(rows)
+    n = int(sel.rank(column.valid_ends[0]))
+    summary = {'count': n}
+    if not n:
+        return summary
+    valid = sel.values[:n]
+    mean = valid.sum() / n
+    low, high = valid[0], valid[-1]
+
+    # numpy.histogram semantics: equal-width bins, the last one closed on the right
+    if low == high:
+        edges = np.linspace(low - 0.5, high + 0.5, bins + 1)
+    else:
+        edges = np.linspace(low, high, bins + 1)
+    counts = np.diff(np.append(sel.below(edges[:-1]), n))
+
+    summary.update({
+        'min': _round(low),
+        'max': _round(high),
+        'mean': _round(mean),
+        'std': _round(np.sqrt(max(np.dot(valid, valid) / n - mean * mean, 0.0))),
+        'percentiles': {f'p{q}': _round(v) for q, v in zip(PERCENTILES, sel.percentiles(0, n, PERCENTILES))},
+        'histogram': {'edges': [_round(e) for e in edges], 'counts': counts.tolist()},
+    })
+    return summary
+
+def _group_summary(column, rows, labels):
+    """Headcount and salary min/median/mean/max per group"""
+    sel = column.select(rows)
+    base = sel.rank(column.starts)
+    headcount = sel.rank(column.ends) - base
+    n = sel.rank(column.valid_ends) - base
+    groups = np.flatnonzero(headcount)
+    has = groups[n[groups] > 0]
+
+    starts = column.starts[has]
+    mins = sel.kth(starts, np.zeros(len(has), dtype=np.int64))
+    maxs = sel.kth(starts, n[has] - 1)
+    medians = (sel.kth(starts, (n[has] - 1) // 2) + sel.kth(starts, n[has] // 2)) / 2
+    means = sel.sums(starts, column.valid_ends[has]) / n[has]
+
+    result = {labels[g] or '(none)': {'headcount': int(headcount[g]), 'salary_count': int(n[g])}
+              for g in groups}
+    for i, g in enumerate(has):
+        result[labels[g] or '(none)'].update({
+            'min': _round(mins[i]),
+            'median': _round(medians[i]),
+            'mean': _round(means[i]),
+            'max': _round(maxs[i]),
+        })
+    return result
+
+def _hire_summary(column, rows, today, months):
+    """Tenure buckets and monthly headcount from hire dates"""
+    sel = column.select(rows)
+    known = int(sel.rank(column.valid_ends[0]))
+    today_day = (today - EPOCH).days
+
+    # Tenure >= edge years  <=>  hired on or before today - edge years
+    cutoffs = [today_day - edge * DAYS_PER_YEAR for edge in TENURE_EDGES]
+    at_least = np.concatenate(([known], sel.below(cutoffs, side='right'), [0]))
+    tenure = dict(zip(TENURE_LABELS, (at_least[:-1] - at_least[1:]).tolist()))
+    tenure['unknown'] = sel.size - known
+
+    # Headcount at the end of each month = employees on file hired before the
+    # next month starts (no termination dates are stored, so leavers still count)
+    end_month = (today.year - 1970) * 12 + today.month - 1
+    start_month = end_month - months + 1
+    bounds = np.arange(start_month, end_month + 2).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    hired_before = sel.below(bounds)
+    series = [{'month': f'{1970 + m // 12:04d}-{m % 12 + 1:02d}',
+               'hires': int(hired_before[i + 1] - hired_before[i]),
+               'headcount': int(hired_before[i + 1])}
+              for i, m in enumerate(range(start_month, end_month + 1))]
+    return tenure, series
+
+class EmployeeAnalytics:
+    """Cached column store plus a small per-version result cache"""
+
+    def __init__(self, connect, current_version, max_results=128):
+        self.connect = connect
+        self.current_version = current_version
+        self.max_results = max_results
+        self._columns = None
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        self.load_ms = 0.0
+
+    def columns(self):
+        version = self.current_version()
+        columns = self._columns
+        if columns is not None and columns.version == version:
+            return columns
+        with self._load_lock:
+            # Requests arriving after a write share one rebuild
+            if self._columns is not None and self._columns.version == version:
+                return self._columns
+            started = time.perf_counter()
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                # SQLite accepts any value in any column: non-numeric salaries load as
+                # NULL (NaN) and non-text labels as their text, so one odd row cannot
+                # break the array conversion
+                rows = cursor.execute('''
+                    SELECT CASE WHEN typeof(salary) IN ('integer', 'real') THEN salary END,
+                           CAST(department AS TEXT), CAST(position AS TEXT),
+                           julianday(hire_date), is_active
+                    FROM employees
+                ''').fetchall()
+            finally:
+                conn.close()
+            columns = EmployeeColumns(rows, version)
+            with self._lock:
+                self._columns = columns
+                self._results.clear()
+                self.loads += 1
+                self.load_ms = round((time.perf_counter() - started) * 1000, 3)
+        return columns
+
+    def report(self, params, today=None):
+        """Analytics for the filters in params (a dict of query args); cached per data version"""
+        cols = self.columns()
+        today = today or date.today()
+        key = (cols.version, tuple(sorted(params.items())), today)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+        result = self._compute(cols, params, today)
+        with self._lock:
+            if cols is self._columns:
+                self._results[key] = result
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        return result
+
+    def _compute(self, cols, params, today):
+        started = time.perf_counter()
+        mask = self._mask(cols, params)
+        bins = self._int(params, 'bins', 20, 1, 200)
+        months = self._int(params, 'months', 24, 1, 240)
+        rows = RowFilter(mask, cols.size)
+
+        tenure, series = _hire_summary(cols.by_hire_day, rows, today, months)
+        return {
+            'total': rows.count,
+            'active': int(np.count_nonzero(cols.active if mask is None else cols.active & mask)),
+            'salary': _salary_summary(cols.by_salary, rows, bins),
+            'by_department': _group_summary(cols.by_department, rows, cols.department_labels),
+            'by_position': _group_summary(cols.by_position, rows, cols.position_labels),
+            'tenure': tenure,
+            'headcount_by_month': series,
+            'compute_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    @staticmethod
+    def _int(params, name, default, low, high):
+        try:
+            value = int(params.get(name, default))
+        except ValueError:
+            raise AnalyticsError(f'{name} must be an integer')
+        return max(low, min(value, high))
+
+    @staticmethod
+    def _float(params, name):
+        try:
+            return float(params[name])
+        except ValueError:
+            raise AnalyticsError(f'{name} must be a number')
+
+    def _mask(self, cols, params):
+        """Boolean row mask for the filters, or None when nothing is filtered"""
+        conditions = []
+        for name, codes, labels in (('department', cols.department, cols.department_labels),
+                                    ('position', cols.position, cols.position_labels)):
+            if params.get(name):
+                wanted = [labels.index(v) for v in params[name].split(',') if v in labels]
+                match = np.zeros(cols.size, dtype=bool)
+                for code in wanted:
+                    match |= codes == code
+                conditions.append(match)
+        if params.get('isActive'):
+            conditions.append(cols.active == (params['isActive'] == 'true'))
+        if params.get('salaryMin'):
+            conditions.append(cols.salary >= self._float(params, 'salaryMin'))
+        if params.get('salaryMax'):
+            conditions.append(cols.salary <= self._float(params, 'salaryMax'))
+        for name, op, offset in (('hiredFrom', np.greater_equal, 0), ('hiredTo', np.less, 1)):
+            if params.get(name):
+                try:
+                    day = (date.fromisoformat(params[name]) - EPOCH).days
+                except ValueError:
+                    raise AnalyticsError(f'{name} must be YYYY-MM-DD')
+                # hiredTo is inclusive: hired before the start of the following day
+                conditions.append(op(cols.hire_day, day + offset))
+
+        if not conditions:
+            return None
+        mask = conditions[0]
+        for condition in conditions[1:]:
+            mask &= condition
+        return mask
+
+    def stats(self):
+        with self._lock:
+            return {
+                'available': available,
+                'rows': self._columns.size if self._columns is not None else 0,
+                'version': self._columns.version if self._columns is not None else None,
+                'loads': self.loads,
+                'last_load_ms': self.load_ms,
+                'cached_results': len(self._results),
+            }
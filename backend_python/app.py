@@ -5,15 +5,37 @@ Python/Flask alternative to Node.js backend
 Provides REST API for authentication and employee/user management
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, has_app_context, Response, stream_with_context, make_response, send_file
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 import sqlite3
 import os
+import atexit
+import sys
+import click
 import json
-from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import zlib
+import time
+import random
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from database import ConnectionPool, PoolTimeout, QueryStats, active_query_stats
+from migrations import run_migrations, rebuild_employee_stats, verify_employee_stats
+from principals import Principal, PrincipalCache
+from versions import DataVersions
+from throttle import LoginThrottle
+from audit import AuditWriter
+from hashing import PasswordHasher, HasherBusy
+from log_partitions import LOG_TABLES, run_maintenance
+from metrics import RequestMetrics
+from slow_queries import SlowQueryLog
+from profiling import ProfileStore
+from replica import EmployeeReplica, install_change_triggers
+import analytics
+from events import ChangeBus
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-this'
@@ -23,169 +45,364 @@ CORS(app,
      origins=['http://localhost:7777', 'http://localhost:8888', 'http://localhost:9000', 
               'http://127.0.0.1:7777', 'http://127.0.0.1:8888', 'http://127.0.0.1:9000'],
      supports_credentials=True,
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'])
+     methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
+     allow_headers=['Content-Type', 'Authorization', 'X-Profile'],
+     expose_headers=['ETag', 'Last-Modified', 'Server-Timing', 'X-Profile-Id'])
 
 # Database setup
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'database.db')
+DB_PATH = os.environ.get('EMS_DB_PATH', os.path.join(os.path.dirname(__file__), 'data', 'database.db'))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+app.config['DB_POOL_SIZE'] = int(os.environ.get('EMS_DB_POOL_SIZE', 8))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('EMS_DB_POOL_TIMEOUT', 10))
+
+app.config['PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('EMS_PRINCIPAL_CACHE_SIZE', 10000))
+app.config['PRINCIPAL_CACHE_TTL'] = float(os.environ.get('EMS_PRINCIPAL_CACHE_TTL', 60))
+
+data_versions = DataVersions()
+# Tables behind conditional GETs; shared across workers by prefork.py
+VERSIONED_TABLES = ('users', 'employees', 'deleted_employees')
+
+# Any user write (in any worker) retires every cached principal
+principal_cache = PrincipalCache(app.config['PRINCIPAL_CACHE_SIZE'], app.config['PRINCIPAL_CACHE_TTL'],
+                                 current_version=lambda: data_versions.version('users'))
+
+app.config['LOGIN_MAX_FAILURES'] = int(os.environ.get('EMS_LOGIN_MAX_FAILURES', 5))
+app.config['LOGIN_LOCKOUT_SECONDS'] = int(os.environ.get('EMS_LOGIN_LOCKOUT_SECONDS', 30))
+app.config['LOGIN_IP_MAX_FAILURES'] = int(os.environ.get('EMS_LOGIN_IP_MAX_FAILURES', 20))
+
+login_throttle = LoginThrottle(max_failures=app.config['LOGIN_MAX_FAILURES'],
+                               lockout=app.config['LOGIN_LOCKOUT_SECONDS'],
+                               ip_max_failures=app.config['LOGIN_IP_MAX_FAILURES'])
+
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('EMS_SLOW_QUERY_MS', 100))
+app.config['SLOW_QUERY_LOG_SIZE'] = int(os.environ.get('EMS_SLOW_QUERY_LOG_SIZE', 500))
+
+# Threshold <= 0 turns the slow-query log off
+slow_query_log = (SlowQueryLog(threshold=app.config['SLOW_QUERY_MS'] / 1000,
+                               max_recent=app.config['SLOW_QUERY_LOG_SIZE'])
+                  if app.config['SLOW_QUERY_MS'] > 0 else None)
+
+app.config['EMPLOYEE_REPLICA'] = os.environ.get('EMS_EMPLOYEE_REPLICA', '0') == '1'
+
+db_pool = ConnectionPool(DB_PATH, size=app.config['DB_POOL_SIZE'], timeout=app.config['DB_POOL_TIMEOUT'],
+                         slow_query_log=slow_query_log,
+                         on_connect=install_change_triggers if app.config['EMPLOYEE_REPLICA'] else None)
+
+# Optional in-memory copy of employees serving list/detail/department reads
+employee_replica = (EmployeeReplica(db_pool.acquire, lambda: data_versions.version('employees'))
+                    if app.config['EMPLOYEE_REPLICA'] else None)
+
+def sync_employee_replica(changes):
+    """data_versions listener: apply the employees this request wrote to the replica
+
+    A bump whose ids are unknown is left unapplied; the replica sees the gap
+    and reloads.
+    """
+    if 'employees' not in changes or not has_app_context() or 'db' not in g:
+        return
+    conn = g.db
+    if not getattr(conn, 'tracks_employees', False):
+        return
+    ids = set(conn.changed_employees)
+    conn.changed_employees.clear()
+    employee_replica.apply(conn, ids, changes['employees'])
+
+if employee_replica is not None:
+    data_versions.subscribe(sync_employee_replica)
+
+# NumPy column store behind /api/employees/analytics (rebuilt per employees version)
+employee_analytics = (analytics.EmployeeAnalytics(db_pool.acquire, lambda: data_versions.version('employees'))
+                      if analytics.available else None)
+
+app.config['STREAM_MAX_CLIENTS'] = int(os.environ.get('EMS_STREAM_MAX_CLIENTS', 100))
+app.config['STREAM_CLIENT_BUFFER'] = int(os.environ.get('EMS_STREAM_CLIENT_BUFFER', 256))
+app.config['STREAM_RING_SIZE'] = int(os.environ.get('EMS_STREAM_RING_SIZE', 1000))
+app.config['STREAM_HEARTBEAT'] = float(os.environ.get('EMS_STREAM_HEARTBEAT', 15))
+
+# Writes touching more employees than this publish one reset event instead
+MAX_CHANGE_EVENTS = 500
+
+change_bus = ChangeBus(ring_size=app.config['STREAM_RING_SIZE'],
+                       max_buffer=app.config['STREAM_CLIENT_BUFFER'],
+                       max_subscribers=app.config['STREAM_MAX_CLIENTS'])
+
+def pending_changes():
+    """Change events recorded by this request, published after its data_versions bump
+
+    A write that bumps employees without calling this is published as a reset.
+    """
+    return g.setdefault('employee_changes', [])
+
+def publish_employee_changes(changes):
+    """data_versions listener: hand the request's recorded events to the change feed"""
+    if 'employees' not in changes:
+        return
+    events = g.pop('employee_changes', None) if has_app_context() else None
+    if events is None or len(events) > MAX_CHANGE_EVENTS:
+        events = [{'type': 'reset', 'reason': 'bulk'}]
+    change_bus.publish(events, version=changes['employees'])
+
+data_versions.subscribe(publish_employee_changes)
+
+app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('EMS_AUDIT_BATCH_SIZE', 200))
+app.config['AUDIT_MAX_DELAY'] = float(os.environ.get('EMS_AUDIT_MAX_DELAY', 0.5))
+app.config['AUDIT_MAX_QUEUE'] = int(os.environ.get('EMS_AUDIT_MAX_QUEUE', 10000))
+app.config['AUDIT_OVERFLOW'] = os.environ.get('EMS_AUDIT_OVERFLOW', 'drop')
+
+audit_writer = AuditWriter(db_pool.acquire,
+                           batch_size=app.config['AUDIT_BATCH_SIZE'],
+                           max_delay=app.config['AUDIT_MAX_DELAY'],
+                           max_queue=app.config['AUDIT_MAX_QUEUE'],
+                           overflow=app.config['AUDIT_OVERFLOW'])
+atexit.register(audit_writer.close)
+
+app.config['LOG_HOT_MONTHS'] = int(os.environ.get('EMS_LOG_HOT_MONTHS', 2))
+app.config['LOG_RETENTION_MONTHS'] = int(os.environ.get('EMS_LOG_RETENTION_MONTHS', 12))
+app.config['LOG_ARCHIVE_DIR'] = os.environ.get('EMS_LOG_ARCHIVE_DIR', os.path.join(os.path.dirname(DB_PATH), 'archive'))
+
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('EMS_PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['HASH_WORKERS'] = int(os.environ.get('EMS_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+app.config['HASH_MAX_PENDING'] = int(os.environ.get('EMS_HASH_MAX_PENDING', 32))
+
+password_hasher = PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'],
+                                 workers=app.config['HASH_WORKERS'],
+                                 max_pending=app.config['HASH_MAX_PENDING'])
+atexit.register(password_hasher.shutdown)
+
+request_metrics = RequestMetrics()
+
+app.config['PROFILE_DIR'] = os.environ.get('EMS_PROFILE_DIR', os.path.join(os.path.dirname(DB_PATH), 'profiles'))
+app.config['PROFILE_MAX_FILES'] = int(os.environ.get('EMS_PROFILE_MAX_FILES', 50))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('EMS_PROFILE_SAMPLE_RATE', 0))
+
+profile_store = ProfileStore(app.config['PROFILE_DIR'], max_files=app.config['PROFILE_MAX_FILES'])
+
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Get database connection
+
+    Inside a request the same pooled connection is reused until teardown;
+    outside a request the caller owns it until conn.close().
+    """
+    if not has_app_context():
+        return db_pool.acquire()
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+        g.db.scoped = True
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    """Return the request's connection to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.scoped = False
+        conn.close()
+
+@app.before_request
+def start_request_metrics():
+    """Start the request clock and per-request SQL counters"""
+    g.request_started = time.perf_counter()
+    g.query_stats = QueryStats()
+    active_query_stats.set(g.query_stats)
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    request_metrics.started(g.metrics_endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency/SQL counters and expose them as Server-Timing"""
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    stats = g.query_stats
+    request_metrics.observe(g.metrics_endpoint, request.method, response.status_code, elapsed, stats)
+    g.metrics_recorded = True
+    response.headers['Server-Timing'] = (
+        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows", '
+        f'app;dur={elapsed * 1000:.2f}')
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exception=None):
+    """Close the in-flight gauge (and count requests that never produced a response)"""
+    # Streamed responses tear down twice (stream_with_context); count once
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    if not g.pop('metrics_recorded', False):
+        request_metrics.observe(g.metrics_endpoint, request.method, 500,
+                                time.perf_counter() - started, g.query_stats)
+    request_metrics.finished(g.metrics_endpoint)
+    active_query_stats.set(None)
+
+def profiling_requested():
+    """Admin asked via X-Profile header / ?_profile=1, or the request was sampled"""
+    if request.headers.get('X-Profile') or request.args.get('_profile'):
+        current_user, _ = authenticate()
+        return current_user is not None and current_user.is_admin
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+_dispatch_request = app.dispatch_request
+
+def dispatch_request():
+    """View dispatch, run under cProfile when profiling_requested()
+
+    Streamed bodies are produced after dispatch and are not included.
+    """
+    if not profiling_requested():
+        return _dispatch_request()
+    label = f'{request.method}-{request.endpoint or "unmatched"}'
+    result, name = profile_store.run(_dispatch_request, label)
+    response = app.make_response(result)
+    response.headers['X-Profile-Id'] = name
+    return response
+
+app.dispatch_request = dispatch_request
 
 def init_db():
-    """Initialize database with schema"""
+    """Initialize database with schema
+
+    Applies any pending numbered migrations; returns immediately when the
+    schema is already current.
+    """
     conn = get_db()
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create employees table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            department TEXT,
-            position TEXT,
-            salary REAL,
-            phone TEXT,
-            hire_date DATE,
-            address TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create password log table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS password_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            action TEXT NOT NULL,
-            changed_by_user_id INTEGER,
-            changed_by_name TEXT,
-            module TEXT,
-            old_password_hash TEXT,
-            new_password_hash TEXT,
-            ip_address TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (changed_by_user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Create login attempts table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS login_attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            email TEXT NOT NULL,
-            attempt_count INTEGER DEFAULT 1,
-            last_attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_locked INTEGER DEFAULT 0,
-            cooldown_until TIMESTAMP,
-            ip_address TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Create deleted employees table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS deleted_employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT,
-            department TEXT,
-            position TEXT,
-            salary REAL,
-            phone TEXT,
-            hire_date DATE,
-            address TEXT,
-            deleted_by_user_id INTEGER,
-            deleted_by_name TEXT,
-            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            deletion_reason TEXT,
-            FOREIGN KEY (deleted_by_user_id) REFERENCES users(id)
-        )
-    ''')
+    try:
+        applied = run_migrations(conn)
+    finally:
+        conn.close()
+    if employee_replica is not None:
+        # Reopen connections so they all get the replica's change triggers
+        db_pool.close_all()
+        employee_replica.load()
+    for version, name in applied:
+        print(f'✓ Migration {version} applied: {name}')
+
+def authenticate():
+    """Resolve the request's bearer token to a Principal
+
+    Returns (principal, None) or (None, error response). The result is kept
+    on g, so later checks in the same request are free.
+    """
+    if 'auth' not in g:
+        g.auth = _authenticate()
+    return g.auth
+
+# Endpoints that also accept ?ticket= -> the scope the ticket must carry.
+# EventSource cannot send an Authorization header, and a bearer token in the
+# URL would end up in access logs, so these take a short-lived ticket instead.
+TICKET_ENDPOINTS = {'stream_changes': 'stream'}
+TICKET_TTL_SECONDS = 60
+
+def issue_ticket(user_id, scope):
+    """Short-lived token accepted only by the TICKET_ENDPOINTS of its scope"""
+    return jwt.encode({
+        'user_id': user_id,
+        'scope': scope,
+        'exp': datetime.utcnow() + timedelta(seconds=TICKET_TTL_SECONDS)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+
+def _authenticate():
+    token = None
+    scope = None
     
-    conn.commit()
+    if 'Authorization' in request.headers:
+        try:
+            token = request.headers['Authorization'].split(' ')[1]
+        except:
+            return None, (jsonify({'error': 'Invalid token format'}), 401)
+    elif request.endpoint in TICKET_ENDPOINTS:
+        token = request.args.get('ticket')
+        scope = TICKET_ENDPOINTS[request.endpoint]
     
-    # Seed admin user if not exists
-    cursor.execute('SELECT * FROM users WHERE email = ?', ('admin@company.com',))
-    if not cursor.fetchone():
-        hashed_pw = generate_password_hash('admin123')
-        cursor.execute('''
-            INSERT INTO users (name, email, password, role)
-            VALUES (?, ?, ?, ?)
-        ''', ('Admin User', 'admin@company.com', hashed_pw, 'admin'))
-        conn.commit()
-        print('✓ Admin user created: admin@company.com / admin123')
-    
-    # Seed sample employees if not exists
-    cursor.execute('SELECT COUNT(*) FROM employees')
-    if cursor.fetchone()[0] == 0:
-        employees = [
-            ('John', 'Smith', 'john.smith@company.com', 'IT', 'Developer', 75000, '555-0101', '2022-01-15', '123 Main St'),
-            ('Sarah', 'Johnson', 'sarah.j@company.com', 'HR', 'Manager', 85000, '555-0102', '2021-06-20', '456 Oak Ave'),
-            ('Mike', 'Brown', 'mike.brown@company.com', 'Sales', 'Executive', 80000, '555-0103', '2022-03-10', '789 Pine Rd'),
-        ]
-        for emp in employees:
-            cursor.execute('''
-                INSERT INTO employees (first_name, last_name, email, department, position, salary, phone, hire_date, address)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', emp)
-        conn.commit()
-        print(f'✓ {len(employees)} sample employees created')
+    if not token:
+        return None, (jsonify({'error': 'Token is missing'}), 401)
     
-    conn.close()
-
-def token_required(f):
-    """Decorator to require valid JWT token"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            try:
-                token = request.headers['Authorization'].split(' ')[1]
-            except:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
+    # Tickets are never cached, so a cached bearer token is never a ticket
+    current_user = principal_cache.get(token) if scope is None else None
+    if current_user is None:
         try:
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
             current_user_id = data['user_id']
         except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
+            return None, (jsonify({'error': 'Token has expired'}), 401)
         except:
-            return jsonify({'error': 'Invalid token'}), 401
+            return None, (jsonify({'error': 'Invalid token'}), 401)
+        # A ticket is not a bearer token, and a bearer token is not a ticket
+        if data.get('scope') != scope:
+            return None, (jsonify({'error': 'Invalid token'}), 401)
         
-        return f(current_user_id, *args, **kwargs)
+        users_version = principal_cache.current_version()
+        conn = get_db()
+        row = conn.execute('SELECT id, name, email, role FROM users WHERE id = ?', (current_user_id,)).fetchone()
+        if not row:
+            return None, (jsonify({'error': 'User not found'}), 401)
+        current_user = Principal(row['id'], row['name'], row['email'], row['role'])
+        if scope is None:
+            principal_cache.put(token, current_user, data.get('exp', float('inf')), users_version)
+    return current_user, None
+
+def token_required(f):
+    """Decorator to require valid JWT token"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        current_user, error = authenticate()
+        if error:
+            return error
+        return f(current_user, *args, **kwargs)
     return decorated
 
+def conditional(*tables, admin_only=False):
+    """Decorator (below token_required) adding ETag/Last-Modified from data_versions
+
+    A matching If-None-Match (or If-Modified-Since) gets a 304 before the
+    view - and therefore any SQL - runs.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if admin_only and not current_user.is_admin:
+                return jsonify({'error': 'Unauthorized'}), 403
+            
+            etag = data_versions.etag(*tables)
+            last_modified = data_versions.last_modified(*tables)
+            # HTTP dates have one-second resolution, so a Last-Modified in the
+            # current second could be followed by another write in that same
+            # second: it is neither sent nor trusted until the second has passed
+            settled = last_modified < datetime.now(timezone.utc).replace(microsecond=0)
+            
+            not_modified = False
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif request.if_modified_since and settled:
+                not_modified = last_modified <= request.if_modified_since
+            
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if settled:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
+
+def log_password_event(user_id, action, module, changed_by_user_id, changed_by_name):
+    """Queue a password_logs audit row (written by audit_writer, off the request path)"""
+    audit_writer.submit('password_logs', {
+        'user_id': user_id,
+        'action': action,
+        'changed_by_user_id': changed_by_user_id,
+        'changed_by_name': changed_by_name,
+        'module': module,
+        'ip_address': request.remote_addr,
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
 def dict_from_row(row):
     """Convert sqlite3.Row to dict"""
     if row is None:
@@ -212,17 +429,19 @@ def register():
         return jsonify({'error': 'Email already exists'}), 409
     
     # Create new user
-    hashed_pw = generate_password_hash(data['password'])
+    hashed_pw = password_hasher.hash(data['password'])
     try:
         cursor.execute('''
             INSERT INTO users (name, email, password, role)
             VALUES (?, ?, ?, ?)
         ''', (data['name'], data['email'], hashed_pw, 'user'))
         conn.commit()
+        data_versions.bump('users')
         
         # Get created user
         cursor.execute('SELECT id, name, email, role FROM users WHERE email = ?', (data['email'],))
         user = dict_from_row(cursor.fetchone())
+        log_password_event(user['id'], 'PASSWORD_SET', 'Registration', user['id'], user['name'])
         
         # Generate token
         token = jwt.encode({
@@ -238,96 +457,86 @@ def register():
 
 @app.route('/api/auth/login', methods=['POST'])
 def login():
-    """Login with email and password with attempt tracking"""
+    """Login with email and password with attempt tracking
+
+    Lockouts are decided by the in-memory login_throttle before any
+    database access or password hashing; login_attempts rows are written
+    asynchronously by audit_writer.
+    """
     data = request.get_json()
     
-    if not data or not data.get('email') or not data.get('password'):
+    if not isinstance(data, dict) or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'Missing email or password'}), 400
     
     email = data['email']
     password = data['password']
     ip_address = request.remote_addr
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Check login attempts
-    cursor.execute('SELECT * FROM login_attempts WHERE email = ?', (email,))
-    login_attempt = cursor.fetchone()
-    
-    if login_attempt:
-        if login_attempt['is_locked']:
-            cooldown_time = datetime.fromisoformat(login_attempt['cooldown_until'])
-            if datetime.utcnow() < cooldown_time:
-                remaining = (cooldown_time - datetime.utcnow()).total_seconds()
-                conn.close()
-                return jsonify({
-                    'error': f'Account locked. Try again in {int(remaining)} seconds',
-                    'locked': True,
-                    'remaining_cooldown': int(remaining)
-                }), 429
-            else:
-                # Cooldown expired, unlock account
-                cursor.execute('UPDATE login_attempts SET is_locked = 0, attempt_count = 0 WHERE email = ?', (email,))
-                conn.commit()
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({'error': 'Email and password must be strings'}), 400
+    
+    # Check lockout (email or IP)
+    remaining = login_throttle.locked_for(email, ip_address)
+    if remaining:
+        return jsonify({
+            'error': f'Account locked. Try again in {int(remaining) or 1} seconds',
+            'locked': True,
+            'remaining_cooldown': int(remaining) or 1
+        }), 429
     
     # Verify credentials
-    cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-    user_row = cursor.fetchone()
+    conn = get_db()
+    user_row = conn.execute('SELECT id, name, email, role, password FROM users WHERE email = ?', (email,)).fetchone()
+    conn.close()
     
-    if not user_row or not check_password_hash(user_row['password'], password):
+    if not user_row or not password_hasher.verify(user_row['password'], password):
         # Log failed attempt
-        if login_attempt:
-            new_count = login_attempt['attempt_count'] + 1
-            cursor.execute('''
-                UPDATE login_attempts 
-                SET attempt_count = ?, last_attempt_time = CURRENT_TIMESTAMP
-                WHERE email = ?
-            ''', (new_count, email))
-            
-            # Check if reached limit
-            if new_count >= 5:
-                cooldown_until = datetime.utcnow() + timedelta(seconds=30)
-                cursor.execute('''
-                    UPDATE login_attempts 
-                    SET is_locked = 1, cooldown_until = ?
-                    WHERE email = ?
-                ''', (cooldown_until.isoformat(), email))
-                conn.commit()
-                conn.close()
-                return jsonify({
-                    'error': 'Account locked due to too many failed attempts. Try again in 30 seconds',
-                    'locked': True,
-                    'remaining_cooldown': 30
-                }), 429
-            elif new_count == 3:
-                conn.commit()
-                conn.close()
-                return jsonify({
-                    'error': 'Invalid email or password. Warning: 2 more attempts before 30-second cooldown',
-                    'attempts_remaining': 5 - new_count,
-                    'warning': True
-                }), 401
-            else:
-                conn.commit()
-                conn.close()
-                return jsonify({
-                    'error': 'Invalid email or password',
-                    'attempts_remaining': 5 - new_count
-                }), 401
+        attempt_count, locked = login_throttle.record_failure(email, ip_address)
+        cooldown_until = datetime.utcnow() + timedelta(seconds=login_throttle.lockout) if locked else None
+        audit_writer.submit('login_attempts', {
+            'user_id': user_row['id'] if user_row else None,
+            'email': email,
+            'attempt_count': attempt_count,
+            'last_attempt_time': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'is_locked': 1 if locked else 0,
+            'cooldown_until': cooldown_until.isoformat() if cooldown_until else None,
+            'ip_address': ip_address,
+        })
+        
+        attempts_remaining = max(login_throttle.max_failures - attempt_count, 0)
+        if locked:
+            return jsonify({
+                'error': f'Account locked due to too many failed attempts. Try again in {login_throttle.lockout} seconds',
+                'locked': True,
+                'remaining_cooldown': login_throttle.lockout
+            }), 429
+        elif attempts_remaining == 2:
+            return jsonify({
+                'error': f'Invalid email or password. Warning: 2 more attempts before {login_throttle.lockout}-second cooldown',
+                'attempts_remaining': attempts_remaining,
+                'warning': True
+            }), 401
         else:
-            # First failed attempt
-            cursor.execute('''
-                INSERT INTO login_attempts (email, user_id, attempt_count, ip_address)
-                VALUES (?, ?, 1, ?)
-            ''', (email, user_row['id'] if user_row else None, ip_address))
-            conn.commit()
-            conn.close()
-            return jsonify({'error': 'Invalid email or password'}), 401
+            return jsonify({
+                'error': 'Invalid email or password',
+                'attempts_remaining': attempts_remaining
+            }), 401
     
     # Successful login - reset attempts
-    if login_attempt:
-        cursor.execute('UPDATE login_attempts SET attempt_count = 0, is_locked = 0 WHERE email = ?', (email,))
+    login_throttle.reset(email)
+    
+    # Upgrade hashes made with an older method/cost while we have the plaintext.
+    # Best effort: the password is already verified, so a busy hasher or
+    # database only postpones the upgrade to a later login.
+    if password_hasher.needs_rehash(user_row['password']):
+        conn = get_db()
+        try:
+            conn.execute('UPDATE users SET password = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                         (password_hasher.hash(password), user_row['id']))
+            conn.commit()
+            log_password_event(user_row['id'], 'PASSWORD_REHASH', 'Login', user_row['id'], user_row['name'])
+        except (HasherBusy, sqlite3.Error) as e:
+            conn.rollback()
+            print(f"✗ Password rehash skipped for user {user_row['id']}: {e}")
     
     user = {
         'id': user_row['id'],
@@ -337,10 +546,13 @@ def login():
     }
     
     # Log successful login attempt
-    cursor.execute('''
-        INSERT INTO login_attempts (user_id, email, attempt_count, ip_address)
-        VALUES (?, ?, 0, ?)
-    ''', (user['id'], email, ip_address))
+    audit_writer.submit('login_attempts', {
+        'user_id': user['id'],
+        'email': email,
+        'attempt_count': 0,
+        'last_attempt_time': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'ip_address': ip_address,
+    })
     
     # Generate JWT token
     token = jwt.encode({
@@ -348,42 +560,28 @@ def login():
         'exp': datetime.utcnow() + timedelta(days=7)
     }, app.config['SECRET_KEY'], algorithm='HS256')
     
-    conn.commit()
-    conn.close()
-    
     return jsonify({'user': user, 'token': token}), 200
 
 @app.route('/api/auth/verify', methods=['GET'])
 @token_required
-def verify_token(current_user_id):
+def verify_token(current_user):
     """Verify JWT token"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, email, role FROM users WHERE id = ?', (current_user_id,))
-    user = dict_from_row(cursor.fetchone())
-    conn.close()
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify(user), 200
+    return jsonify(current_user.to_dict()), 200
 
 # ============ User Routes ============
 
 @app.route('/api/users', methods=['GET'])
 @token_required
-def get_users(current_user_id):
+@conditional('users', admin_only=True)
+def get_users(current_user):
     """Get all users (admin only)"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     # Get all users
     cursor.execute('SELECT id, name, email, role, created_at FROM users ORDER BY created_at DESC')
     users = [dict_from_row(row) for row in cursor.fetchall()]
@@ -393,7 +591,7 @@ def get_users(current_user_id):
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 @token_required
-def get_user(current_user_id, user_id):
+def get_user(current_user, user_id):
     """Get specific user"""
     conn = get_db()
     cursor = conn.cursor()
@@ -408,18 +606,16 @@ def get_user(current_user_id, user_id):
 
 @app.route('/api/users', methods=['POST'])
 @token_required
-def create_user(current_user_id):
+def create_user(current_user):
     """Create new user (admin only)"""
     data = request.get_json()
     
     # Check admin
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
-        return jsonify({'error': 'Unauthorized'}), 403
     
     # Validate
     if not data or not data.get('email') or not data.get('password') or not data.get('name'):
@@ -433,7 +629,7 @@ def create_user(current_user_id):
         return jsonify({'error': 'Email already exists'}), 409
     
     # Create user
-    hashed_pw = generate_password_hash(data['password'])
+    hashed_pw = password_hasher.hash(data['password'])
     role = data.get('role', 'user')
     
     try:
@@ -442,10 +638,12 @@ def create_user(current_user_id):
             VALUES (?, ?, ?, ?)
         ''', (data['name'], data['email'], hashed_pw, role))
         conn.commit()
+        data_versions.bump('users')
         
         cursor.execute('SELECT id, name, email, role FROM users WHERE email = ?', (data['email'],))
         new_user = dict_from_row(cursor.fetchone())
         conn.close()
+        log_password_event(new_user['id'], 'PASSWORD_SET', 'User Management', current_user.id, current_user.name)
         
         return jsonify(new_user), 201
     except Exception as e:
@@ -454,27 +652,30 @@ def create_user(current_user_id):
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 @token_required
-def delete_user(current_user_id, user_id):
+def delete_user(current_user, user_id):
     """Delete user (admin only)"""
     # Check admin
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
     # Prevent self-deletion
-    if current_user_id == user_id:
-        conn.close()
+    if current_user.id == user_id:
         return jsonify({'error': 'Cannot delete your own account'}), 400
     
+    # Queued audit rows for this user must land before it goes; its log and
+    # archive rows then keep their history with the user reference cleared
+    audit_writer.flush()
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
     # Delete user
     try:
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
         conn.commit()
+        data_versions.bump('users')
         conn.close()
+        principal_cache.invalidate_user(user_id)
         return jsonify({'message': 'User deleted'}), 200
     except Exception as e:
         conn.close()
@@ -482,22 +683,105 @@ def delete_user(current_user_id, user_id):
 
 # ============ Employee Routes ============
 
+# Sortable columns -> ORDER BY expression. NULLs are coalesced so keyset
+# comparisons never silently drop rows.
+EMPLOYEE_SORT_COLUMNS = {
+    'id': 'id',
+    'first_name': "COALESCE(first_name, '')",
+    'last_name': "COALESCE(last_name, '')",
+    'email': 'email',
+    'department': "COALESCE(department, '')",
+    'position': "COALESCE(position, '')",
+    'salary': 'COALESCE(salary, 0)',
+    'hire_date': "COALESCE(hire_date, '')",
+    'is_active': 'COALESCE(is_active, 0)',
+    'created_at': "COALESCE(created_at, '')",
+    'updated_at': "COALESCE(updated_at, '')",
+}
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def encode_cursor(sort_by, order, value, row_id):
+    """Build an opaque keyset cursor from the last row of a page"""
+    payload = json.dumps([sort_by, order, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_by, order):
+    """Return (value, id) from a cursor, or raise ValueError if it doesn't match the query"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        c_sort, c_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if c_sort != sort_by or c_order != order or not isinstance(row_id, int):
+        raise ValueError('Cursor does not match sort order')
+    return value, row_id
+
+def row_to_public(row):
+    """Row as dict without internal helper columns (prefixed with _)"""
+    return {k: row[k] for k in row.keys() if not k.startswith('_')}
+
+def stream_rows(cursor, fmt):
+    """Yield rows from an executed cursor as JSON array or NDJSON chunks"""
+    first = True
+    if fmt == 'json':
+        yield '['
+    while True:
+        rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        if fmt == 'ndjson':
+            yield ''.join(json.dumps(row_to_public(row)) + '\n' for row in rows)
+        else:
+            chunk = ','.join(json.dumps(row_to_public(row)) for row in rows)
+            yield chunk if first else ',' + chunk
+            first = False
+    if fmt == 'json':
+        yield ']'
+
+def fts_query(text):
+    """Turn free text into an FTS5 prefix query: every word must match a column prefix"""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return ' '.join(f'"{t}"*' for t in terms)
+
+def employees_from_replica(department, is_active, sort_by, order, limit, after):
+    """get_employees answered from the in-memory replica (same shape and cursors)"""
+    rows = employee_replica.query(
+        department=department or None,
+        is_active=(1 if is_active == 'true' else 0) if is_active else None,
+        sort_by=sort_by, descending=order == 'DESC', after=after,
+        limit=None if limit is None else limit + 1)
+    if limit is None:
+        return jsonify(rows), 200
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, order, employee_replica.sort_value(sort_by, last[sort_by]), last['id'])
+    
+    return jsonify({'employees': rows, 'next': next_cursor}), 200
+
 @app.route('/api/employees', methods=['GET'])
 @token_required
-def get_employees(current_user_id):
-    """Get all employees with optional filters"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
+@conditional('employees')
+def get_employees(current_user):
+    """Get all employees with optional filters
+
+    Optional query params:
+      limit / cursor  - keyset pagination, returns {'employees': [...], 'next': cursor}
+      stream          - 'json' or 'ndjson' to stream rows instead of building the list
+    """
     # Build query
-    query = 'SELECT * FROM employees WHERE 1=1'
+    query = ' FROM employees WHERE 1=1'
     params = []
     
     # Filters
-    search = request.args.get('search', '')
+    search = fts_query(request.args.get('search', ''))
     if search:
-        query += ' AND (name LIKE ? OR email LIKE ?)'
-        params.extend([f'%{search}%', f'%{search}%'])
+        query += ' AND id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?)'
+        params.append(search)
     
     department = request.args.get('department', '')
     if department:
@@ -511,19 +795,193 @@ def get_employees(current_user_id):
     
     # Sorting
     sort_by = request.args.get('sortBy', 'created_at')
-    order = request.args.get('order', 'DESC')
-    query += f' ORDER BY {sort_by} {order}'
+    order = request.args.get('order', 'DESC').upper()
+    if sort_by not in EMPLOYEE_SORT_COLUMNS:
+        return jsonify({'error': f'Invalid sort column: {sort_by}'}), 400
+    if order not in ('ASC', 'DESC'):
+        return jsonify({'error': 'Order must be ASC or DESC'}), 400
+    sort_expr = EMPLOYEE_SORT_COLUMNS[sort_by]
+    
+    # Keyset pagination
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor_token = request.args.get('cursor')
+    after = None
+    if cursor_token:
+        try:
+            after = decode_cursor(cursor_token, sort_by, order)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    stream_format = request.args.get('stream', '')
+    if stream_format and stream_format not in ('json', 'ndjson'):
+        return jsonify({'error': 'stream must be json or ndjson'}), 400
+    
+    if employee_replica is not None and not search and not stream_format and employee_replica.fresh():
+        return employees_from_replica(department, is_active, sort_by, order, limit, after)
+    
+    if after:
+        op = '<' if order == 'DESC' else '>'
+        query += f' AND ({sort_expr}, id) {op} (?, ?)'
+        params.extend(after)
+    
+    query = f'SELECT *, {sort_expr} AS _sort_key' + query
+    query += f' ORDER BY {sort_expr} {order}, id {order}'
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        query += ' LIMIT ?'
+        params.append(limit + 1)
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    if stream_format:
+        if limit is not None:
+            params[-1] = limit
+        cursor.execute(query, params)
+        mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+        return Response(stream_with_context(stream_rows(cursor, stream_format)), mimetype=mimetype)
     
     cursor.execute(query, params)
-    employees = [dict_from_row(row) for row in cursor.fetchall()]
+    rows = cursor.fetchall()
+    conn.close()
+    
+    if limit is None:
+        return jsonify([row_to_public(row) for row in rows]), 200
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_by, order, rows[-1]['_sort_key'], rows[-1]['id'])
+    employees = [row_to_public(row) for row in rows]
+    
+    return jsonify({'employees': employees, 'next': next_cursor}), 200
+
+@app.route('/api/employees/search', methods=['GET'])
+@token_required
+def search_employees(current_user):
+    """Full-text employee search ranked by bm25"""
+    match = fts_query(request.args.get('q', ''))
+    if not match:
+        return jsonify({'error': 'Missing search query'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    # Weights follow column order: names and email count most
+    cursor.execute('''
+        SELECT e.*, bm25(employees_fts, 10.0, 10.0, 5.0, 2.0, 2.0, 1.0) AS _rank
+        FROM employees_fts
+        JOIN employees e ON e.id = employees_fts.rowid
+        WHERE employees_fts MATCH ?
+        ORDER BY _rank
+        LIMIT ?
+    ''', (match, limit))
+    employees = []
+    for row in cursor.fetchall():
+        employee = row_to_public(row)
+        employee['score'] = -row['_rank']
+        employees.append(employee)
     conn.close()
     
     return jsonify(employees), 200
 
+@app.route('/api/employees/search/suggest', methods=['GET'])
+@token_required
+def suggest_employees(current_user):
+    """Typeahead: compact name/email matches for the text typed so far"""
+    match = fts_query(request.args.get('q', ''))
+    if not match:
+        return jsonify([]), 200
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT e.id, e.first_name, e.last_name, e.email, e.department
+        FROM employees_fts
+        JOIN employees e ON e.id = employees_fts.rowid
+        WHERE employees_fts MATCH ?
+        ORDER BY bm25(employees_fts, 10.0, 10.0, 5.0, 2.0, 2.0, 1.0)
+        LIMIT ?
+    ''', (match, limit))
+    suggestions = [dict_from_row(row) for row in cursor.fetchall()]
+    conn.close()
+    
+    return jsonify(suggestions), 200
+
+@app.route('/api/employees/changes', methods=['GET'])
+@token_required
+@conditional('employees')
+def get_employee_changes(current_user):
+    """Delta sync: employees changed after a cursor, oldest change first
+
+    since - cursor from a previous response (omit for a full initial sync)
+    limit - page size; keep calling with the returned cursor while has_more
+
+    Returns {'changes': [rows], 'deleted': [tombstones], 'cursor', 'has_more'}.
+    A tombstone carries the archive entry and deleted_at; once restored it
+    comes back with restored_as (the restored employee's new id).
+    """
+    since = request.args.get('since', '0')
+    if not since.isdigit():
+        return jsonify({'error': 'Invalid cursor'}), 400
+    since = int(since)
+    limit = max(1, min(request.args.get('limit', MAX_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    # Both reads share one snapshot, so the page and the high-water mark agree
+    cursor.execute('BEGIN')
+    latest = cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM employee_changes').fetchone()[0]
+    if since > latest:
+        conn.rollback()
+        conn.close()
+        return jsonify({'error': 'Cursor is ahead of the server; sync again without since'}), 410
+    cursor.execute('''
+        SELECT c.seq AS change_seq, c.employee_id AS change_id, c.deleted_at AS change_deleted_at,
+               c.archive_id AS change_archive_id, c.restored_as AS change_restored_as, e.*
+        FROM employee_changes c
+        LEFT JOIN employees e ON e.id = c.employee_id
+        WHERE c.seq > ?
+        ORDER BY c.seq
+        LIMIT ?
+    ''', (since, limit))
+    rows = cursor.fetchall()
+    conn.rollback()
+    conn.close()
+    
+    changes, deleted = [], []
+    for row in rows:
+        row = dict_from_row(row)
+        del row['change_seq']
+        tombstone = {'id': row.pop('change_id'),
+                     'deleted_at': row.pop('change_deleted_at'),
+                     'archive_id': row.pop('change_archive_id'),
+                     'restored_as': row.pop('change_restored_as')}
+        if row['id'] is None:
+            deleted.append(tombstone)
+        else:
+            changes.append(row)
+    
+    return jsonify({
+        'changes': changes,
+        'deleted': deleted,
+        'cursor': str(rows[-1]['change_seq'] if rows else since),
+        'has_more': bool(rows) and rows[-1]['change_seq'] < latest,
+    }), 200
+
 @app.route('/api/employees/<int:emp_id>', methods=['GET'])
 @token_required
-def get_employee(current_user_id, emp_id):
+def get_employee(current_user, emp_id):
     """Get specific employee"""
+    if employee_replica is not None and employee_replica.fresh():
+        employee = employee_replica.get(emp_id)
+        if not employee:
+            return jsonify({'error': 'Employee not found'}), 404
+        return jsonify(employee), 200
+    
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
@@ -535,17 +993,16 @@ def get_employee(current_user_id, emp_id):
     
     return jsonify(employee), 200
 
-@app.route('/api/employees', methods=['POST'])
-@token_required
-def create_employee(current_user_id):
-    """Create new employee"""
-    data = request.get_json()
-    
+# Employee write operations. Each takes a cursor, does not commit and
+# returns (response body, status) so single routes and /api/batch share them.
+
+EMPLOYEE_UPDATE_FIELDS = ['first_name', 'last_name', 'email', 'department', 'position',
+                          'salary', 'phone', 'hire_date', 'address', 'is_active']
+
+def insert_employee(cursor, data):
+    """Insert an employee; returns the created row"""
     if not data or not data.get('email') or not data.get('first_name'):
-        return jsonify({'error': 'Missing required fields'}), 400
-    
-    conn = get_db()
-    cursor = conn.cursor()
+        return {'error': 'Missing required fields'}, 400
     
     try:
         cursor.execute('''
@@ -562,132 +1019,618 @@ def create_employee(current_user_id):
             data.get('hire_date', datetime.now().date()),
             data.get('address', '')
         ))
-        conn.commit()
-        
-        emp_id = cursor.lastrowid
-        cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
-        employee = dict_from_row(cursor.fetchone())
-        conn.close()
-        
-        return jsonify(employee), 201
-    except Exception as e:
-        conn.close()
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/employees/<int:emp_id>', methods=['PUT'])
-@token_required
-def update_employee(current_user_id, emp_id):
-    """Update employee"""
-    data = request.get_json()
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Check exists
-    cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
-    if not cursor.fetchone():
-        conn.close()
-        return jsonify({'error': 'Employee not found'}), 404
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
     
-    # Update
+    cursor.execute('SELECT * FROM employees WHERE id = ?', (cursor.lastrowid,))
+    employee = dict_from_row(cursor.fetchone())
+    pending_changes().append({'type': 'created', 'id': employee['id'], 'fields': employee})
+    return employee, 201
+
+def apply_employee_update(cursor, emp_id, data):
+    """Update the given fields of an employee; returns the updated row"""
     update_fields = []
     params = []
     
-    for field in ['first_name', 'last_name', 'email', 'department', 'position', 'salary', 'phone', 'hire_date', 'address', 'is_active']:
-        if field in data:
+    for field in EMPLOYEE_UPDATE_FIELDS:
+        if field in (data or {}):
             update_fields.append(f'{field} = ?')
             params.append(data[field])
     
     if not update_fields:
-        conn.close()
-        return jsonify({'error': 'No fields to update'}), 400
+        return {'error': 'No fields to update'}, 400
     
     update_fields.append('updated_at = CURRENT_TIMESTAMP')
     params.append(emp_id)
     
-    query = f"UPDATE employees SET {', '.join(update_fields)} WHERE id = ?"
+    before = dict_from_row(cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,)).fetchone())
+    try:
+        cursor.execute(f"UPDATE employees SET {', '.join(update_fields)} WHERE id = ?", params)
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
+    if cursor.rowcount == 0:
+        return {'error': 'Employee not found'}, 404
     
+    cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
+    employee = dict_from_row(cursor.fetchone())
+    changed = {k: v for k, v in employee.items() if k != 'updated_at' and v != before[k]}
+    events = pending_changes()
+    if changed:
+        events.append({'type': 'updated', 'id': emp_id, 'fields': changed})
+    return employee, 200
+
+def archive_employee(cursor, emp_id, current_user):
+    """Soft delete: move an employee into deleted_employees"""
     try:
-        cursor.execute(query, params)
-        conn.commit()
-        
-        cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
-        employee = dict_from_row(cursor.fetchone())
-        conn.close()
+        cursor.execute('''
+            INSERT INTO deleted_employees 
+            (employee_id, first_name, last_name, email, department, position, 
+             salary, phone, hire_date, address, deleted_by_user_id, deleted_by_name)
+            SELECT id, first_name, last_name, email, department, position,
+                   salary, phone, hire_date, address, ?, ?
+            FROM employees WHERE id = ?
+        ''', (current_user.id, current_user.name, emp_id))
+        if cursor.rowcount == 0:
+            return {'error': 'Employee not found'}, 404
+        archive_id = cursor.lastrowid
         
-        return jsonify(employee), 200
-    except Exception as e:
-        conn.close()
-        return jsonify({'error': str(e)}), 500
+        # Delete from active employees
+        cursor.execute('DELETE FROM employees WHERE id = ?', (emp_id,))
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
+    pending_changes().append({'type': 'archived', 'id': emp_id, 'archive_id': archive_id})
+    return {'message': 'Employee deleted and moved to archive'}, 200
 
-@app.route('/api/employees/<int:emp_id>', methods=['DELETE'])
+def restore_archived_employee(cursor, archive_id):
+    """Move an archived employee back into employees"""
+    try:
+        # Restore to employees table
+        cursor.execute('''
+            INSERT INTO employees 
+            (first_name, last_name, email, department, position, 
+             salary, phone, hire_date, address, is_active)
+            SELECT first_name, last_name, email, department, position,
+                   salary, phone, hire_date, address, 1
+            FROM deleted_employees WHERE id = ?
+        ''', (archive_id,))
+        if cursor.rowcount == 0:
+            return {'error': 'Deleted employee not found'}, 404
+        employee = dict_from_row(cursor.execute('SELECT * FROM employees WHERE id = ?', (cursor.lastrowid,)).fetchone())
+        
+        # Delete from deleted_employees table
+        cursor.execute('DELETE FROM deleted_employees WHERE id = ?', (archive_id,))
+    except sqlite3.Error as e:
+        return {'error': str(e)}, 500
+    pending_changes().append({'type': 'restored', 'id': employee['id'], 'archive_id': archive_id, 'fields': employee})
+    return {'message': 'Employee restored'}, 200
+
+@app.route('/api/employees', methods=['POST'])
+@token_required
+def create_employee(current_user):
+    """Create new employee"""
+    conn = get_db()
+    body, status = insert_employee(conn.cursor(), request.get_json())
+    if status < 400:
+        conn.commit()
+        data_versions.bump('employees')
+    conn.close()
+    
+    return jsonify(body), status
+
+@app.route('/api/employees/<int:emp_id>', methods=['PUT'])
 @token_required
-def delete_employee(current_user_id, emp_id):
+def update_employee(current_user, emp_id):
+    """Update employee"""
+    conn = get_db()
+    body, status = apply_employee_update(conn.cursor(), emp_id, request.get_json())
+    if status < 400:
+        conn.commit()
+        data_versions.bump('employees')
+    conn.close()
+    
+    return jsonify(body), status
+
+@app.route('/api/employees/<int:emp_id>', methods=['DELETE'])
+@token_required
+def delete_employee(current_user, emp_id):
     """Soft delete employee (move to deleted_employees table)"""
+    conn = get_db()
+    body, status = archive_employee(conn.cursor(), emp_id, current_user)
+    if status < 400:
+        conn.commit()
+        data_versions.bump('employees', 'deleted_employees')
+    conn.close()
+    
+    return jsonify(body), status
+
+# ============ Batch API ============
+
+MAX_BATCH_OPERATIONS = 1000
+
+# op name -> (tables written, admin only)
+BATCH_OPERATIONS = {
+    'create_employee': (('employees',), False),
+    'update_employee': (('employees',), False),
+    'delete_employee': (('employees', 'deleted_employees'), False),
+    'restore_employee': (('employees', 'deleted_employees'), True),
+}
+
+def run_batch_operation(cursor, current_user, operation):
+    """Dispatch one batch sub-operation to the shared employee write helpers"""
+    if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+        return {'error': 'Unknown operation'}, 400
+    op = operation['op']
+    if BATCH_OPERATIONS[op][1] and not current_user.is_admin:
+        return {'error': 'Unauthorized'}, 403
+    if op != 'create_employee' and not isinstance(operation.get('id'), int):
+        return {'error': 'Missing id'}, 400
+    
+    if op == 'create_employee':
+        return insert_employee(cursor, operation.get('data'))
+    if op == 'update_employee':
+        return apply_employee_update(cursor, operation['id'], operation.get('data'))
+    if op == 'delete_employee':
+        return archive_employee(cursor, operation['id'], current_user)
+    return restore_archived_employee(cursor, operation['id'])
+
+@app.route('/api/batch', methods=['POST'])
+@token_required
+def batch(current_user):
+    """Run an ordered list of employee operations in one transaction
+
+    Body: {"mode": "atomic" | "continue", "operations": [{"op": ..., "id": ..., "data": {...}}, ...]}
+      atomic   - stop at the first failure and roll everything back (default)
+      continue - roll back only the failed operation and keep going
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    mode = data.get('mode', 'atomic')
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+    if mode not in ('atomic', 'continue'):
+        return jsonify({'error': 'mode must be atomic or continue'}), 400
+    
     conn = get_db()
     cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    
+    results = []
+    touched = set()
+    failed_index = None
+    for index, operation in enumerate(operations):
+        # Savepoint per operation so a failure leaves earlier operations intact
+        cursor.execute('SAVEPOINT batch_op')
+        recorded = len(pending_changes())
+        body, status = run_batch_operation(cursor, current_user, operation)
+        if status < 400:
+            cursor.execute('RELEASE batch_op')
+            touched.update(BATCH_OPERATIONS[operation['op']][0])
+        else:
+            cursor.execute('ROLLBACK TO batch_op')
+            cursor.execute('RELEASE batch_op')
+            del pending_changes()[recorded:]
+        results.append({'index': index, 'status': status, 'body': body})
+        
+        if status >= 400 and mode == 'atomic':
+            failed_index = index
+            break
     
-    # Check exists
-    cursor.execute('SELECT * FROM employees WHERE id = ?', (emp_id,))
-    employee = cursor.fetchone()
-    if not employee:
+    if failed_index is not None:
+        conn.rollback()
         conn.close()
-        return jsonify({'error': 'Employee not found'}), 404
+        return jsonify({'committed': False, 'failed_index': failed_index, 'results': results}), 400
+    
+    conn.commit()
+    if touched:
+        data_versions.bump(*touched)
+    conn.close()
+    
+    return jsonify({
+        'committed': True,
+        'succeeded': sum(1 for r in results if r['status'] < 400),
+        'failed': sum(1 for r in results if r['status'] >= 400),
+        'results': results
+    }), 200
+
+# ============ Bulk Update / Archive / Restore ============
+
+MAX_BULK_IDS = 50000
+
+def bulk_selection(spec, filter_fields):
+    """Build a WHERE clause from {"ids": [...]} and/or {"filter": {...}}
+
+    Returns (sql, params, None) or (None, None, error). An empty selection is
+    rejected so a missing filter can never touch the whole table.
+    """
+    if not isinstance(spec, dict):
+        return None, None, 'Body must be a JSON object'
+    clauses = []
+    params = []
     
-    # Get current user info
-    cursor.execute('SELECT name FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
+    ids = spec.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return None, None, 'ids must be a list of integers'
+        if len(ids) > MAX_BULK_IDS:
+            return None, None, f'At most {MAX_BULK_IDS} ids per request'
+        # One bound parameter regardless of list length
+        clauses.append('id IN (SELECT value FROM json_each(?))')
+        params.append(json.dumps(ids))
+    
+    filters = spec.get('filter') or {}
+    if not isinstance(filters, dict):
+        return None, None, 'filter must be an object'
+    for field, value in filters.items():
+        if field not in filter_fields:
+            return None, None, f'Cannot filter on {field}'
+        if field == 'is_active':
+            value = 1 if value in (True, 1, 'true') else 0
+        clauses.append(f'{field} IS ?')
+        params.append(value)
+    
+    if not clauses:
+        return None, None, 'Provide ids or a filter'
+    return ' AND '.join(clauses), params, None
+
+@app.route('/api/employees/bulk', methods=['PATCH'])
+@token_required
+def bulk_update_employees(current_user):
+    """Set the same fields on every employee matching ids/filter (admin only)
+
+    Body: {"ids": [...], "filter": {"department": "X"}, "set": {"department": "Y"}}
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
     
+    data = request.get_json(silent=True) or {}
+    where, params, error = bulk_selection(data, ('department', 'position', 'is_active'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    changes = data.get('set') or {}
+    if not isinstance(changes, dict):
+        return jsonify({'error': 'set must be an object'}), 400
+    fields = [f for f in changes if f in EMPLOYEE_UPDATE_FIELDS and f != 'email']
+    if not fields or len(fields) != len(changes):
+        return jsonify({'error': f"set must only contain: {', '.join(f for f in EMPLOYEE_UPDATE_FIELDS if f != 'email')}"}), 400
+    if any(isinstance(changes[f], (list, dict)) for f in fields):
+        return jsonify({'error': 'set values must be strings, numbers or null'}), 400
+    
+    assignments = ', '.join(f'{f} = ?' for f in fields)
+    conn = get_db()
     try:
-        # Move to deleted_employees table
-        cursor.execute('''
-            INSERT INTO deleted_employees 
-            (employee_id, first_name, last_name, email, department, position, 
-             salary, phone, hire_date, address, deleted_by_user_id, deleted_by_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            emp_id,
-            employee['first_name'],
-            employee['last_name'],
-            employee['email'],
-            employee['department'],
-            employee['position'],
-            employee['salary'],
-            employee['phone'],
-            employee['hire_date'],
-            employee['address'],
-            current_user_id,
-            user['name'] if user else 'Unknown'
-        ))
-        
-        # Delete from active employees
-        cursor.execute('DELETE FROM employees WHERE id = ?', (emp_id,))
+        conn.execute('BEGIN IMMEDIATE')
+        # Ids for the change feed (more than MAX_CHANGE_EVENTS becomes a reset)
+        ids = [row[0] for row in conn.execute(f'SELECT id FROM employees WHERE {where} LIMIT ?',
+                                              params + [MAX_CHANGE_EVENTS + 1])]
+        cursor = conn.execute(f'UPDATE employees SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE {where}',
+                              [changes[f] for f in fields] + params)
+        updated = cursor.rowcount
         conn.commit()
-        conn.close()
-        return jsonify({'message': 'Employee deleted and moved to archive'}), 200
-    except Exception as e:
-        conn.close()
+    except sqlite3.Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    if updated:
+        if len(ids) <= MAX_CHANGE_EVENTS:
+            pending_changes().extend({'type': 'updated', 'id': emp_id, 'fields': {f: changes[f] for f in fields}}
+                                     for emp_id in ids)
+        data_versions.bump('employees')
+    conn.close()
+    
+    return jsonify({'updated': updated}), 200
+
+@app.route('/api/employees/bulk-archive', methods=['POST'])
+@token_required
+def bulk_archive_employees(current_user):
+    """Soft delete every employee matching ids/filter (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    where, params, error = bulk_selection(data, ('department', 'position', 'is_active'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    conn = get_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        last_archive_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM deleted_employees').fetchone()[0]
+        cursor = conn.execute(f'''
+            INSERT INTO deleted_employees
+            (employee_id, first_name, last_name, email, department, position,
+             salary, phone, hire_date, address, deleted_by_user_id, deleted_by_name, deletion_reason)
+            SELECT id, first_name, last_name, email, department, position,
+                   salary, phone, hire_date, address, ?, ?, ?
+            FROM employees WHERE {where}
+        ''', [current_user.id, current_user.name, data.get('reason')] + params)
+        archived = cursor.rowcount
+        entries = []
+        if archived <= MAX_CHANGE_EVENTS:
+            entries = conn.execute('SELECT id, employee_id FROM deleted_employees WHERE id > ?',
+                                   (last_archive_id,)).fetchall()
+        conn.execute(f'DELETE FROM employees WHERE {where}', params)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    if archived:
+        if archived <= MAX_CHANGE_EVENTS:
+            pending_changes().extend({'type': 'archived', 'id': row['employee_id'], 'archive_id': row['id']}
+                                     for row in entries)
+        data_versions.bump('employees', 'deleted_employees')
+    conn.close()
+    
+    return jsonify({'archived': archived}), 200
+
+@app.route('/api/deleted-employees/bulk-restore', methods=['POST'])
+@token_required
+def bulk_restore_employees(current_user):
+    """Restore every archive entry matching ids/filter (admin only)
+
+    Entries whose email already belongs to an active employee are skipped,
+    and when one email was archived several times only the newest entry
+    is restored.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    where, params, error = bulk_selection(data, ('department', 'position', 'employee_id'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    conn = get_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_restore_ids (id INTEGER PRIMARY KEY)')
+        conn.execute('DELETE FROM bulk_restore_ids')
+        selected = conn.execute(f'SELECT COUNT(*) FROM deleted_employees WHERE {where}', params).fetchone()[0]
+        conn.execute(f'''
+            INSERT INTO bulk_restore_ids (id)
+            SELECT MAX(id) FROM deleted_employees d
+            WHERE {where}
+              AND NOT EXISTS (SELECT 1 FROM employees e WHERE e.email = d.email)
+            GROUP BY email
+        ''', params)
+        last_employee_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM employees').fetchone()[0]
+        cursor = conn.execute('''
+            INSERT INTO employees
+            (first_name, last_name, email, department, position,
+             salary, phone, hire_date, address, is_active)
+            SELECT first_name, last_name, email, department, position,
+                   salary, phone, hire_date, address, 1
+            FROM deleted_employees WHERE id IN (SELECT id FROM bulk_restore_ids)
+        ''')
+        restored = cursor.rowcount
+        events = []
+        if restored <= MAX_CHANGE_EVENTS:
+            # Restored emails are unique (one archive entry per email)
+            archive_ids = {row['email']: row['id'] for row in conn.execute(
+                'SELECT id, email FROM deleted_employees WHERE id IN (SELECT id FROM bulk_restore_ids)')}
+            events = [{'type': 'restored', 'id': row['id'], 'archive_id': archive_ids.get(row['email']),
+                       'fields': dict_from_row(row)}
+                      for row in conn.execute('SELECT * FROM employees WHERE id > ?', (last_employee_id,))]
+        conn.execute('DELETE FROM deleted_employees WHERE id IN (SELECT id FROM bulk_restore_ids)')
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
         return jsonify({'error': str(e)}), 500
+    if restored:
+        if restored <= MAX_CHANGE_EVENTS:
+            pending_changes().extend(events)
+        data_versions.bump('employees', 'deleted_employees')
+    conn.close()
+    
+    return jsonify({'restored': restored, 'skipped': selected - restored}), 200
+
+# ============ Bulk Import ============
+
+EMPLOYEE_IMPORT_FIELDS = ['first_name', 'last_name', 'email', 'department', 'position',
+                          'salary', 'phone', 'hire_date', 'address', 'is_active']
+
+app.config['BULK_BATCH_SIZE'] = int(os.environ.get('EMS_BULK_BATCH_SIZE', 500))
+MAX_REPORTED_ERRORS = 1000
+
+def iter_import_records(stream, fmt):
+    """Yield (line_no, dict) from a CSV or NDJSON byte stream without buffering it"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_no, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, record if isinstance(record, dict) else None
+
+# Text columns of an import row; NDJSON numbers are accepted as their text
+IMPORT_TEXT_FIELDS = ('first_name', 'last_name', 'email', 'department', 'position', 'phone', 'hire_date', 'address')
+
+def validate_import_record(record):
+    """Return (values tuple in EMPLOYEE_IMPORT_FIELDS order, None) or (None, error)"""
+    if not isinstance(record, dict):
+        return None, 'Malformed row'
+    text = {}
+    for field in IMPORT_TEXT_FIELDS:
+        value = record.get(field)
+        if value is None:
+            value = ''
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif not isinstance(value, str):
+            return None, f'Invalid {field}'
+        text[field] = value.strip() if field in ('first_name', 'email') else value
+    first_name = text['first_name']
+    email = text['email']
+    if not first_name or not email:
+        return None, 'Missing required fields'
+    if '@' not in email:
+        return None, 'Invalid email'
+    
+    salary = record.get('salary')
+    if salary in (None, ''):
+        salary = 0
+    try:
+        salary = float(salary)
+    except (TypeError, ValueError):
+        return None, 'Invalid salary'
+    
+    is_active = record.get('is_active', 1)
+    if isinstance(is_active, str):
+        is_active = 0 if is_active.strip().lower() in ('0', 'false', 'no') else 1
+    elif isinstance(is_active, (list, dict)):
+        return None, 'Invalid is_active'
+    
+    return (
+        first_name,
+        text['last_name'],
+        email,
+        text['department'],
+        text['position'],
+        salary,
+        text['phone'],
+        text['hire_date'] or datetime.now().date().isoformat(),
+        text['address'],
+        1 if is_active else 0,
+    ), None
+
+def import_batch(conn, batch, upsert, summary):
+    """Insert (or upsert) one validated batch in a single transaction"""
+    emails = [values[2] for _, values in batch]
+    placeholders = ','.join('?' * len(emails))
+    seen = {row[0] for row in conn.execute(
+        f'SELECT email FROM employees WHERE email IN ({placeholders})', emails)}
+    
+    columns = ', '.join(EMPLOYEE_IMPORT_FIELDS)
+    values_sql = ', '.join('?' * len(EMPLOYEE_IMPORT_FIELDS))
+    sql = f'INSERT INTO employees ({columns}) VALUES ({values_sql})'
+    if upsert:
+        updates = ', '.join(f'{f} = excluded.{f}' for f in EMPLOYEE_IMPORT_FIELDS if f != 'email')
+        sql += f' ON CONFLICT(email) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP'
+    
+    # (line_no, values, is_update) for rows that will be written
+    accepted = []
+    for line_no, values in batch:
+        exists = values[2] in seen
+        if exists and not upsert:
+            record_import_error(summary, line_no, values[2], 'Email already exists')
+            continue
+        seen.add(values[2])
+        accepted.append((line_no, values, exists))
+    
+    try:
+        conn.executemany(sql, [values for _, values, _ in accepted])
+        conn.commit()
+    except sqlite3.IntegrityError:
+        # A concurrent writer took one of the emails - retry row by row
+        conn.rollback()
+        written = []
+        for line_no, values, exists in accepted:
+            try:
+                conn.execute(sql, values)
+                written.append(exists)
+            except sqlite3.IntegrityError as e:
+                record_import_error(summary, line_no, values[2], str(e))
+        conn.commit()
+    else:
+        written = [exists for _, _, exists in accepted]
+    
+    summary['updated'] += sum(written)
+    summary['inserted'] += len(written) - sum(written)
+
+def record_import_error(summary, line_no, email, error):
+    summary['failed'] += 1
+    if len(summary['errors']) < MAX_REPORTED_ERRORS:
+        summary['errors'].append({'row': line_no, 'email': email, 'error': error})
+    else:
+        summary['errors_truncated'] = True
+
+@app.route('/api/employees/bulk', methods=['POST'])
+@token_required
+def bulk_import_employees(current_user):
+    """Stream-import employees from a CSV or NDJSON body
+
+    Query params:
+      format      - 'csv' or 'ndjson' (default taken from Content-Type)
+      mode        - 'insert' (default, duplicate emails are reported) or 'upsert' (update by email)
+      batch_size  - rows per transaction
+    
+    Batches commit as the body streams in. If the body stops parsing part
+    way, the 400 response keeps the counts of what was already written and
+    `committed_through`: every row up to that line is committed or listed
+    in `errors`, so a retry should resend only the rows after it.
+    """
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    mode = request.args.get('mode', 'insert')
+    if mode not in ('insert', 'upsert'):
+        return jsonify({'error': 'mode must be insert or upsert'}), 400
+    
+    batch_size = request.args.get('batch_size', app.config['BULK_BATCH_SIZE'], type=int)
+    batch_size = max(1, min(batch_size, 10000))
+    
+    summary = {'received': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    conn = get_db()
+    batch = []
+    committed_through = 0
+    
+    try:
+        for line_no, record in iter_import_records(request.stream, fmt):
+            summary['received'] += 1
+            values, error = validate_import_record(record)
+            if error:
+                email = record.get('email') if isinstance(record, dict) else None
+                record_import_error(summary, line_no, email if isinstance(email, str) else None, error)
+                continue
+            batch.append((line_no, values))
+            if len(batch) >= batch_size:
+                import_batch(conn, batch, mode == 'upsert', summary)
+                batch = []
+                committed_through = line_no
+        if batch:
+            import_batch(conn, batch, mode == 'upsert', summary)
+    except (UnicodeDecodeError, csv.Error) as e:
+        conn.rollback()
+        data_versions.bump('employees')
+        summary['error'] = f'Could not parse body: {e}'
+        summary['committed_through'] = committed_through
+        return jsonify(summary), 400
+    
+    conn.close()
+    data_versions.bump('employees')
+    return jsonify(summary), 200
 
 # ============ Password & Login Log Routes ============
+# Read through the <table>_all views so rotated months stay visible
 
 @app.route('/api/password-logs', methods=['GET'])
 @token_required
-def get_password_logs(current_user_id):
+def get_password_logs(current_user):
     """Get password change logs (admin only)"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     cursor.execute('''
         SELECT id, user_id, action, changed_by_name, module, timestamp
-        FROM password_logs
+        FROM password_logs_all
         ORDER BY timestamp DESC
         LIMIT 100
     ''')
@@ -698,21 +1641,18 @@ def get_password_logs(current_user_id):
 
 @app.route('/api/password-logs/user/<int:user_id>', methods=['GET'])
 @token_required
-def get_user_password_logs(current_user_id, user_id):
+def get_user_password_logs(current_user, user_id):
     """Get password logs for specific user"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin or same user
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or (user['role'] != 'admin' and current_user_id != user_id):
-        conn.close()
+    if not current_user.is_admin and current_user.id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     cursor.execute('''
         SELECT id, action, changed_by_name, module, timestamp
-        FROM password_logs
+        FROM password_logs_all
         WHERE user_id = ?
         ORDER BY timestamp DESC
         LIMIT 50
@@ -724,22 +1664,19 @@ def get_user_password_logs(current_user_id, user_id):
 
 @app.route('/api/login-logs', methods=['GET'])
 @token_required
-def get_login_logs(current_user_id):
+def get_login_logs(current_user):
     """Get login attempt logs (admin only)"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     cursor.execute('''
         SELECT id, user_id, email, attempt_count, last_attempt_time, 
                is_locked, ip_address
-        FROM login_attempts
+        FROM login_attempts_all
         ORDER BY last_attempt_time DESC
         LIMIT 200
     ''')
@@ -750,21 +1687,18 @@ def get_login_logs(current_user_id):
 
 @app.route('/api/login-logs/user/<int:user_id>', methods=['GET'])
 @token_required
-def get_user_login_logs(current_user_id, user_id):
+def get_user_login_logs(current_user, user_id):
     """Get login logs for specific user"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin or same user
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or (user['role'] != 'admin' and current_user_id != user_id):
-        conn.close()
+    if not current_user.is_admin and current_user.id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     cursor.execute('''
         SELECT id, attempt_count, last_attempt_time, is_locked, ip_address
-        FROM login_attempts
+        FROM login_attempts_all
         WHERE user_id = ?
         ORDER BY last_attempt_time DESC
         LIMIT 50
@@ -774,20 +1708,62 @@ def get_user_login_logs(current_user_id, user_id):
     
     return jsonify(logs), 200
 
-@app.route('/api/deleted-employees', methods=['GET'])
+@app.route('/api/login-logs/daily', methods=['GET'])
 @token_required
-def get_deleted_employees(current_user_id):
-    """Get deleted employees (admin only)"""
+def get_login_log_rollups(current_user):
+    """Daily per-email/per-IP login summaries for archived months (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    query = 'SELECT * FROM login_attempts_daily WHERE 1=1'
+    params = []
+    for arg, clause in (('from', ' AND day >= ?'), ('to', ' AND day <= ?'), ('email', ' AND email = ?')):
+        if request.args.get(arg):
+            query += clause
+            params.append(request.args[arg])
+    query += ' ORDER BY day DESC, email LIMIT 1000'
+    
     conn = get_db()
-    cursor = conn.cursor()
+    summaries = [dict_from_row(row) for row in conn.execute(query, params).fetchall()]
+    conn.close()
     
+    return jsonify(summaries), 200
+
+def run_log_maintenance(conn):
+    """Run log partition maintenance with the configured retention settings"""
+    audit_writer.flush()
+    return run_maintenance(conn, app.config['LOG_ARCHIVE_DIR'],
+                           hot_months=app.config['LOG_HOT_MONTHS'],
+                           retention_months=app.config['LOG_RETENTION_MONTHS'])
+
+@app.route('/api/admin/log-maintenance', methods=['POST'])
+@token_required
+def log_maintenance(current_user):
+    """Rotate, roll up and archive log partitions (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    conn = get_db()
+    try:
+        report = run_log_maintenance(conn)
+    except (sqlite3.Error, OSError) as e:
+        return jsonify({'error': str(e)}), 500
+    conn.close()
+    
+    return jsonify(report), 200
+
+@app.route('/api/deleted-employees', methods=['GET'])
+@token_required
+@conditional('deleted_employees', admin_only=True)
+def get_deleted_employees(current_user):
+    """Get deleted employees (admin only)"""
     # Check if admin
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    conn = get_db()
+    cursor = conn.cursor()
+    
     cursor.execute('''
         SELECT id, employee_id, first_name, last_name, email, department, position,
                salary, phone, hire_date, deleted_by_name, deleted_at
@@ -801,86 +1777,68 @@ def get_deleted_employees(current_user_id):
 
 @app.route('/api/deleted-employees/<int:emp_id>/restore', methods=['POST'])
 @token_required
-def restore_employee(current_user_id, emp_id):
+def restore_employee(current_user, emp_id):
     """Restore deleted employee"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Check if admin
-    cursor.execute('SELECT role FROM users WHERE id = ?', (current_user_id,))
-    user = cursor.fetchone()
-    if not user or user['role'] != 'admin':
-        conn.close()
+    if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Get deleted employee
-    cursor.execute('SELECT * FROM deleted_employees WHERE id = ?', (emp_id,))
-    deleted_emp = cursor.fetchone()
-    if not deleted_emp:
-        conn.close()
-        return jsonify({'error': 'Deleted employee not found'}), 404
-    
-    try:
-        # Restore to employees table
-        cursor.execute('''
-            INSERT INTO employees 
-            (first_name, last_name, email, department, position, 
-             salary, phone, hire_date, address, is_active)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-        ''', (
-            deleted_emp['first_name'],
-            deleted_emp['last_name'],
-            deleted_emp['email'],
-            deleted_emp['department'],
-            deleted_emp['position'],
-            deleted_emp['salary'],
-            deleted_emp['phone'],
-            deleted_emp['hire_date'],
-            deleted_emp['address']
-        ))
-        
-        # Delete from deleted_employees table
-        cursor.execute('DELETE FROM deleted_employees WHERE id = ?', (emp_id,))
+    conn = get_db()
+    body, status = restore_archived_employee(conn.cursor(), emp_id)
+    if status < 400:
         conn.commit()
-        conn.close()
-        return jsonify({'message': 'Employee restored'}), 200
-    except Exception as e:
-        conn.close()
-        return jsonify({'error': str(e)}), 500
+        data_versions.bump('employees', 'deleted_employees')
+    conn.close()
+    
+    return jsonify(body), status
 
 @app.route('/api/employees/statistics', methods=['GET'])
 @token_required
-def get_statistics(current_user_id):
-    """Get employee statistics"""
+@conditional('employees')
+def get_statistics(current_user):
+    """Get employee statistics (read from the trigger-maintained employee_stats table)"""
     conn = get_db()
     cursor = conn.cursor()
+    cursor.execute('SELECT department, headcount, active, salary_sum, salary_count FROM employee_stats')
+    rows = cursor.fetchall()
+    conn.close()
     
-    stats = {}
-    
-    # Total employees
-    cursor.execute('SELECT COUNT(*) as count FROM employees')
-    stats['total'] = cursor.fetchone()['count']
-    
-    # By department
-    cursor.execute('SELECT department, COUNT(*) as count FROM employees GROUP BY department')
-    stats['by_department'] = {row['department']: row['count'] for row in cursor.fetchall()}
-    
-    # Average salary
-    cursor.execute('SELECT AVG(salary) as avg_salary FROM employees')
-    result = cursor.fetchone()
-    stats['average_salary'] = result['avg_salary'] or 0
-    
-    # Active employees
-    cursor.execute('SELECT COUNT(*) as count FROM employees WHERE is_active = 1')
-    stats['active'] = cursor.fetchone()['count']
+    salary_sum = sum(row['salary_sum'] for row in rows)
+    salary_count = sum(row['salary_count'] for row in rows)
     
-    conn.close()
+    stats = {
+        'total': sum(row['headcount'] for row in rows),
+        'by_department': {row['department']: row['headcount'] for row in rows},
+        'average_salary': salary_sum / salary_count if salary_count else 0,
+        'active': sum(row['active'] for row in rows),
+    }
     return jsonify(stats), 200
 
+@app.route('/api/employees/analytics', methods=['GET'])
+@token_required
+@conditional('employees')
+def get_analytics(current_user):
+    """Salary distribution, per-department/position salary ranges, tenure and monthly headcount
+
+    Filters: department, position (comma-separated), isActive, hiredFrom,
+    hiredTo, salaryMin, salaryMax; options: bins, months
+    """
+    if employee_analytics is None:
+        return jsonify({'error': 'Analytics needs numpy (pip install numpy)'}), 503
+    try:
+        report = employee_analytics.report(request.args.to_dict())
+    except analytics.AnalyticsError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report), 200
+
 @app.route('/api/employees/departments', methods=['GET'])
 @token_required
-def get_departments(current_user_id):
+@conditional('employees')
+def get_departments(current_user):
     """Get list of departments"""
+    if employee_replica is not None and employee_replica.fresh():
+        return jsonify(employee_replica.departments()), 200
+    
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT DISTINCT department FROM employees ORDER BY department')
@@ -889,6 +1847,217 @@ def get_departments(current_user_id):
     
     return jsonify(departments), 200
 
+# ============ Change Stream ============
+
+@app.route('/api/stream/ticket', methods=['POST'])
+@token_required
+def stream_ticket(current_user):
+    """Ticket for opening /api/stream/changes (valid TICKET_TTL_SECONDS, stream only)"""
+    return jsonify({'ticket': issue_ticket(current_user.id, 'stream'),
+                    'expires_in': TICKET_TTL_SECONDS}), 200
+
+@app.route('/api/stream/changes', methods=['GET'])
+@token_required
+def stream_changes(current_user):
+    """Server-Sent Events feed of employee changes
+
+    Events: created / updated / archived / restored (id plus changed fields)
+    and reset (refetch: bulk write, slow client, or a resume point that is
+    no longer in the ring). A reconnect resumes after Last-Event-ID
+    (or ?lastEventId=). Browsers authenticate with ?ticket= from
+    POST /api/stream/ticket.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    
+    subscriber = change_bus.subscribe(last_event_id)
+    if subscriber is None:
+        return jsonify({'error': 'Too many change stream clients'}), 503
+    heartbeat = app.config['STREAM_HEARTBEAT']
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            last_sent = time.monotonic()
+            while True:
+                # Wake every second to notice other workers' writes and send heartbeats
+                entries = change_bus.wait(subscriber, timeout=1.0)
+                if entries is None:
+                    return
+                if entries:
+                    yield ''.join(change_bus.format(entry) for entry in entries)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= heartbeat:
+                    yield ': keepalive\n\n'
+                    last_sent = time.monotonic()
+                change_bus.check_version(data_versions.version('employees'))
+        finally:
+            change_bus.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ============ Export Routes ============
+
+# table -> (exported columns, column used by from/to filters, admin only)
+# password_logs deliberately omits the stored password hashes. Log tables
+# are read through their <table>_all views so archived months are included.
+EXPORT_TABLES = {
+    'employees': (
+        ['id', 'first_name', 'last_name', 'email', 'department', 'position', 'salary',
+         'phone', 'hire_date', 'address', 'is_active', 'created_at', 'updated_at'],
+        'created_at', False),
+    'deleted_employees': (
+        ['id', 'employee_id', 'first_name', 'last_name', 'email', 'department', 'position',
+         'salary', 'phone', 'hire_date', 'address', 'deleted_by_user_id', 'deleted_by_name',
+         'deleted_at', 'deletion_reason'],
+        'deleted_at', True),
+    'login_attempts': (
+        ['id', 'user_id', 'email', 'attempt_count', 'last_attempt_time', 'is_locked',
+         'cooldown_until', 'ip_address'],
+        'last_attempt_time', True),
+    'password_logs': (
+        ['id', 'user_id', 'action', 'changed_by_user_id', 'changed_by_name', 'module',
+         'ip_address', 'timestamp'],
+        'timestamp', True),
+}
+
+def export_chunks(cursor, columns, fmt):
+    """Yield CSV or NDJSON text chunks, one per fetchmany batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        if fmt == 'csv':
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(columns, row))) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/export/<table>', methods=['GET'])
+@token_required
+def export_table(current_user, table):
+    """Stream a table as CSV or NDJSON
+
+    Query params: format (csv|ndjson), gzip (1), from / to (ISO dates, inclusive)
+    """
+    if table not in EXPORT_TABLES:
+        return jsonify({'error': 'Unknown export table'}), 404
+    columns, date_column, admin_only = EXPORT_TABLES[table]
+    if admin_only and not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    source = f'{table}_all' if table in LOG_TABLES else table
+    query = f"SELECT {', '.join(columns)} FROM {source} WHERE 1=1"
+    params = []
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    try:
+        if date_from:
+            query += f' AND {date_column} >= ?'
+            params.append(datetime.fromisoformat(date_from).strftime('%Y-%m-%d %H:%M:%S'))
+        if date_to:
+            # Date-only upper bounds include the whole day
+            upper = datetime.fromisoformat(date_to)
+            if len(date_to) == 10:
+                upper += timedelta(days=1)
+                query += f' AND {date_column} < ?'
+            else:
+                query += f' AND {date_column} <= ?'
+            params.append(upper.strftime('%Y-%m-%d %H:%M:%S'))
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO dates'}), 400
+    if source == table:
+        query += ' ORDER BY id'
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    
+    chunks = export_chunks(cursor, columns, fmt)
+    filename = f"{table}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if request.args.get('gzip') in ('1', 'true'):
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# ============ Diagnostics ============
+
+@app.route('/api/admin/slow-queries', methods=['GET', 'DELETE'])
+@token_required
+def slow_queries(current_user):
+    """Slowest statements by total/count/max time with their query plans (admin only)
+
+    DELETE clears the log.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if slow_query_log is None:
+        return jsonify({'error': 'Slow-query log is disabled (EMS_SLOW_QUERY_MS <= 0)'}), 404
+
+    if request.method == 'DELETE':
+        slow_query_log.clear()
+        return jsonify({'message': 'Slow-query log cleared'}), 200
+
+    sort = request.args.get('sort', 'total')
+    if sort not in ('total', 'count', 'max'):
+        return jsonify({'error': 'sort must be total, count or max'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 200))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    return jsonify({
+        'threshold_ms': slow_query_log.threshold * 1000,
+        'top': slow_query_log.top(limit, sort),
+        'recent': slow_query_log.recent(limit),
+    }), 200
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@token_required
+def list_profiles(current_user):
+    """Stored request profiles, newest first (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(profile_store.list()), 200
+
+@app.route('/api/admin/profiles/<name>', methods=['GET'])
+@token_required
+def download_profile(current_user, name):
+    """Raw cProfile stats file, for pstats/snakeviz (admin only)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    path = profile_store.path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
 # ============ Health Check ============
 
 @app.route('/health', methods=['GET'])
@@ -905,8 +2074,64 @@ def root():
         'docs': '/api/docs'
     }), 200
 
+@app.route('/health/db', methods=['GET'])
+def db_health_check():
+    """Connection pool statistics"""
+    return jsonify(db_pool.stats()), 200
+
+@app.route('/health/audit', methods=['GET'])
+def audit_health_check():
+    """Audit writer queue statistics"""
+    return jsonify(audit_writer.stats()), 200
+
+@app.route('/health/replica', methods=['GET'])
+def replica_health_check():
+    """Employee read replica statistics"""
+    if employee_replica is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify({'enabled': True, **employee_replica.stats()}), 200
+
+@app.route('/health/analytics', methods=['GET'])
+def analytics_health_check():
+    """Analytics column store statistics"""
+    if employee_analytics is None:
+        return jsonify({'available': False}), 200
+    return jsonify(employee_analytics.stats()), 200
+
+@app.route('/health/stream', methods=['GET'])
+def stream_health_check():
+    """Change feed subscribers and event counters"""
+    return jsonify(change_bus.stats()), 200
+
+@app.route('/health/hashing', methods=['GET'])
+def hashing_health_check():
+    """Password hashing pool statistics"""
+    return jsonify(password_hasher.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, SQL and pool metrics in Prometheus text format"""
+    pool = db_pool.stats()
+    body = request_metrics.render({
+        'db_pool_in_use': ('Pooled connections checked out', pool['in_use']),
+        'db_pool_idle': ('Pooled connections idle', pool['idle']),
+        'db_pool_waits_total': ('Checkouts that had to wait for a connection', pool['waits']),
+        'audit_queue_depth': ('Audit rows waiting to be written', audit_writer.stats()['queued']),
+        'hashing_pending': ('Password hash calls queued or running', password_hasher.stats()['pending']),
+        'principal_cache_entries': ('Verified tokens cached', principal_cache.stats()['entries']),
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # ============ Error Handlers ============
 
+@app.errorhandler(HasherBusy)
+def hasher_busy(error):
+    return jsonify({'error': 'Server busy, try again'}), 503
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(error):
+    return jsonify({'error': 'Database busy, try again'}), 503
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -915,7 +2140,50 @@ def not_found(error):
 def server_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+# ============ CLI Commands ============
+
+@app.cli.command('logs-maintain')
+def logs_maintain_command():
+    """Rotate log tables into monthly partitions, roll up and archive expired months"""
+    conn = get_db()
+    try:
+        report = run_log_maintenance(conn)
+    finally:
+        conn.close()
+    for table, result in report.items():
+        moved = sum(result['moved'].values())
+        print(f"✓ {table}: {moved} rows moved to partitions, {len(result['expired'])} partitions archived")
+        for entry in result['expired']:
+            print(f"  → {entry['archive']}")
+
+@app.cli.command('stats')
+@click.option('--rebuild', is_flag=True, help='Recompute employee_stats from scratch')
+def stats_command(rebuild):
+    """Verify (or rebuild) the employee statistics summary table"""
+    conn = get_db()
+    try:
+        if rebuild:
+            rebuild_employee_stats(conn)
+            conn.commit()
+            print('✓ employee_stats rebuilt')
+            return
+        drift = verify_employee_stats(conn)
+    finally:
+        conn.close()
+    if not drift:
+        print('✓ employee_stats matches employees')
+        return
+    for entry in drift:
+        print(f"✗ {entry['department'] or '(none)'}: expected {entry['expected']}, found {entry['actual']}")
+    sys.exit(1)
+
 if __name__ == '__main__':
+    workers = int(os.environ.get('EMS_WORKERS', 1))
+    if workers > 1:
+        # Multi-process: hand over to the prefork launcher (runs init_db itself)
+        launcher = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prefork.py')
+        os.execv(sys.executable, [sys.executable, launcher, '--workers', str(workers), '--port', '5002'])
+    
     print('🔧 Initializing database...')
     init_db()
     print('✓ Database ready')
@@ -0,0 +1,188 @@
+"""
+Asynchronous audit writer
+Collects audit rows (login attempts, password changes) in a bounded
+in-memory queue and group-commits them from a background thread, so auth
+endpoints never wait on an audit fsync
+"""
+
+import queue
+import threading
+import time
+
+class _FlushRequest:
+    """Queue marker: write everything before it, then signal"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+class AuditWriter:
+    """Background group-commit writer for append-only audit tables
+
+    Rows are committed in one transaction per batch, when `batch_size` rows
+    are waiting or `max_delay` seconds after the oldest one arrived,
+    whichever comes first.
+
+    overflow='block' makes submit() wait up to `block_timeout` seconds for
+    room in the queue; overflow='drop' discards the row immediately. Either
+    way a row that cannot be queued is counted in `dropped`.
+    """
+
+    def __init__(self, connect, batch_size=200, max_delay=0.5, max_queue=10000,
+                 overflow='drop', block_timeout=1.0):
+        if overflow not in ('block', 'drop'):
+            raise ValueError("overflow must be 'block' or 'drop'")
+        self.connect = connect
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, table, row):
+        """Queue a row (dict of column -> value) for insertion into table"""
+        if self._closed:
+            self.dropped += 1
+            return False
+        self.start()
+        try:
+            if self.overflow == 'block':
+                self._queue.put((table, row), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _FlushRequest):
+                self._write(batch)
+                batch, deadline = [], None
+                item.done.set()
+                continue
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.max_delay
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def flush(self, timeout=10):
+        """Block until every row queued so far is committed (tests, shutdown, user deletion)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self._drain()
+            return True
+        request = _FlushRequest()
+        self._queue.put(request, timeout=timeout)
+        return request.done.wait(timeout)
+
+    def close(self):
+        """Flush outstanding rows and refuse new ones (registered with atexit)"""
+        self.flush()
+        self._closed = True
+
+    def _drain(self):
+        """Write queued rows on the calling thread (writer thread not running)"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            else:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def _write(self, batch):
+        """Insert a batch in one transaction, one executemany per table/column set"""
+        if not batch:
+            return
+        groups = {}
+        for table, row in batch:
+            groups.setdefault((table, tuple(row)), []).append(tuple(row.values()))
+
+        conn = None
+        try:
+            conn = self.connect()
+            for (table, columns), rows in groups.items():
+                conn.executemany(self._insert_sql(table, columns), rows)
+            conn.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            if conn is None:
+                # No connection (pool timeout, disk error): count the batch and keep the writer alive
+                self.failed += len(batch)
+                print(f'✗ Audit batch dropped ({len(batch)} rows): {e}')
+                return
+            # One bad row (e.g. a user deleted meanwhile) must not sink the batch
+            conn.rollback()
+            self._write_rows_individually(conn, groups)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write_rows_individually(self, conn, groups):
+        written = 0
+        for (table, columns), rows in groups.items():
+            sql = self._insert_sql(table, columns)
+            for row in rows:
+                try:
+                    conn.execute(sql, row)
+                    written += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f'✗ Audit row dropped ({table}): {e}')
+        try:
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.failed += written
+            print(f'✗ Audit batch dropped ({written} rows): {e}')
+            return
+        self.written += written
+        self.batches += 1
+
+    @staticmethod
+    def _insert_sql(table, columns):
+        placeholders = ', '.join('?' * len(columns))
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'overflow': self.overflow,
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
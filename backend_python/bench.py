@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+API benchmark harness
+Seeds a scratch database with synthetic employees and logs, runs scripted
+workloads against the Flask app (in-process test client or a running
+server) and writes per-route throughput and latency percentiles as JSON
+
+    python bench.py seed --db /tmp/bench.db --employees 100000
+    python bench.py run --db /tmp/bench.db --out results.json
+    python bench.py compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'HR', 'Finance', 'Operations',
+               'Support', 'Legal', 'IT', 'Product', 'Design', 'Research']
+POSITIONS = ['Associate', 'Analyst', 'Engineer', 'Senior Engineer', 'Manager',
+             'Director', 'Specialist', 'Coordinator', 'Executive', 'Intern']
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+               'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+               'Thomas', 'Sarah', 'Charles', 'Karen', 'Maria', 'Ahmed', 'Wei', 'Yuki', 'Olga']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+              'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Chen', 'Kim', 'Singh']
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lake Blvd']
+
+BENCH_PASSWORD = 'bench-password'
+
+# ============ Synthetic Data ============
+
+def employee_rows(count, rng):
+    start = datetime(2010, 1, 1)
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        hired = start + timedelta(days=rng.randrange(5800))
+        created = hired + timedelta(seconds=rng.randrange(86400))
+        yield (
+            first, last, f'{first.lower()}.{last.lower()}.{i}@bench.example',
+            rng.choice(DEPARTMENTS), rng.choice(POSITIONS),
+            round(rng.lognormvariate(11.1, 0.35), 2),
+            f'555-{rng.randrange(10000):04d}', hired.strftime('%Y-%m-%d'),
+            f'{rng.randrange(1, 9999)} {rng.choice(STREETS)}',
+            1 if rng.random() < 0.92 else 0,
+            created.strftime('%Y-%m-%d %H:%M:%S'), created.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+def login_rows(count, users, rng, now):
+    for _ in range(count):
+        user_id, email = rng.choice(users)
+        failed = rng.random() < 0.15
+        yield (
+            user_id, email, rng.randrange(1, 6) if failed else 0,
+            (now - timedelta(seconds=rng.randrange(86400 * 60))).strftime('%Y-%m-%d %H:%M:%S'),
+            1 if failed and rng.random() < 0.1 else 0,
+            f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+        )
+
+def password_rows(count, users, rng, now):
+    for _ in range(count):
+        user_id, _ = rng.choice(users)
+        yield (
+            user_id, rng.choice(['PASSWORD_SET', 'PASSWORD_CHANGE', 'PASSWORD_RESET']),
+            1, 'Admin User', rng.choice(['Registration', 'User Management', 'Login']),
+            (now - timedelta(seconds=rng.randrange(86400 * 60))).strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+def seed(db_path, employees, users=200, logins=None, password_logs=None, deleted_ratio=0.05, seed_value=42):
+    """Create a scratch database with synthetic data; returns row counts"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.environ['EMS_DB_PATH'] = db_path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from werkzeug.security import generate_password_hash
+    import migrations
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    logins = employees * 2 if logins is None else logins
+    password_logs = users * 5 if password_logs is None else password_logs
+
+    conn = sqlite3.connect(db_path)
+    migrations.run_migrations(conn)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    # Bulk load without per-row trigger work; indexes are rebuilt afterwards
+    for trigger in ('employees_fts_ai', 'employees_fts_ad', 'employees_fts_au',
+                    'employee_stats_ai', 'employee_stats_ad', 'employee_stats_au'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    pw_hash = generate_password_hash(BENCH_PASSWORD)
+    conn.executemany('INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
+                     ((f'Bench User {i}', f'user{i}@bench.example', pw_hash, 'admin' if i == 0 else 'user')
+                      for i in range(users)))
+    user_list = conn.execute("SELECT id, email FROM users WHERE email LIKE '%@bench.example'").fetchall()
+
+    conn.executemany('''
+        INSERT INTO employees (first_name, last_name, email, department, position, salary, phone,
+                               hire_date, address, is_active, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', employee_rows(employees, rng))
+
+    archived = int(employees * deleted_ratio)
+    conn.execute('''
+        INSERT INTO deleted_employees (employee_id, first_name, last_name, email, department, position,
+                                       salary, phone, hire_date, address, deleted_by_user_id, deleted_by_name)
+        SELECT id, first_name, last_name, email, department, position, salary, phone, hire_date, address,
+               ?, 'Bench User 0'
+        FROM employees WHERE email LIKE '%@bench.example' ORDER BY random() LIMIT ?
+    ''', (user_list[0][0], archived))
+    conn.execute('DELETE FROM employees WHERE id IN (SELECT employee_id FROM deleted_employees)')
+
+    conn.executemany('''
+        INSERT INTO login_attempts (user_id, email, attempt_count, last_attempt_time, is_locked, ip_address)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', login_rows(logins, user_list, rng, now))
+    conn.executemany('''
+        INSERT INTO password_logs (user_id, action, changed_by_user_id, changed_by_name, module, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', password_rows(password_logs, user_list, rng, now))
+    conn.commit()
+
+    migrations.run_script(conn, migrations.EMPLOYEE_FTS_SCHEMA)
+    migrations.run_script(conn, migrations.EMPLOYEE_STATS_SCHEMA)
+    conn.execute("INSERT INTO employees_fts(employees_fts) VALUES ('rebuild')")
+    migrations.rebuild_employee_stats(conn)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'employees', 'deleted_employees', 'login_attempts', 'password_logs')}
+    conn.close()
+    return counts
+
+# ============ Clients ============
+
+class TestClient:
+    """In-process client over Flask's test client"""
+
+    def __init__(self, db_path):
+        os.environ['EMS_DB_PATH'] = db_path
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app as app_module
+        app_module.init_db()
+        self.app = app_module.app
+        self.local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None, remote_addr='127.0.0.1'):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=json_body, headers=headers or {},
+                               environ_base={'REMOTE_ADDR': remote_addr})
+        response.get_data()
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    """Client for a running server (python app.py / prefork launcher)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, json_body=None, headers=None, remote_addr=None):
+        data = json.dumps(json_body).encode() if json_body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json', **(headers or {})})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            status = e.code
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+# ============ Workloads ============
+
+class Recorder:
+    """Collects latency samples per route label"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def time(self, label, fn):
+        started = time.perf_counter()
+        status, body = fn()
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(label, []).append(elapsed)
+            if status >= 500:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return status, body
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+def login_token(client, email='user0@bench.example'):
+    status, body = client.request('POST', '/api/auth/login', {'email': email, 'password': BENCH_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f'Benchmark login failed ({status}): {body}')
+    return body['token']
+
+def workload_list(client, rec, auth, rng, n):
+    for _ in range(n):
+        choice = rng.random()
+        if choice < 0.3:
+            rec.time('GET /api/employees?limit=100', lambda: client.request(
+                'GET', '/api/employees?limit=100', headers=auth))
+        elif choice < 0.6:
+            dept = rng.choice(DEPARTMENTS)
+            rec.time('GET /api/employees?department&limit=100', lambda: client.request(
+                'GET', f'/api/employees?department={dept}&isActive=true&limit=100', headers=auth))
+        else:
+            rec.time('GET /api/employees?sortBy=salary&limit=100', lambda: client.request(
+                'GET', '/api/employees?sortBy=salary&order=DESC&limit=100', headers=auth))
+
+def workload_search(client, rec, auth, rng, n):
+    for _ in range(n):
+        term = rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randrange(2, 5)]
+        rec.time('GET /api/employees/search', lambda: client.request(
+            'GET', f'/api/employees/search?q={term}&limit=20', headers=auth))
+        rec.time('GET /api/employees/search/suggest', lambda: client.request(
+            'GET', f'/api/employees/search/suggest?q={term}', headers=auth))
+
+def workload_statistics(client, rec, auth, rng, n):
+    for _ in range(n):
+        rec.time('GET /api/employees/statistics', lambda: client.request(
+            'GET', '/api/employees/statistics', headers=auth))
+        rec.time('GET /api/employees/departments', lambda: client.request(
+            'GET', '/api/employees/departments', headers=auth))
+
+def workload_analytics(client, rec, auth, rng, n):
+    # Random salary floors keep most requests out of the per-version result cache
+    for _ in range(n):
+        dept = rng.choice(DEPARTMENTS)
+        floor = rng.randrange(20000, 120000)
+        rec.time('GET /api/employees/analytics?department', lambda: client.request(
+            'GET', f'/api/employees/analytics?department={dept}&salaryMin={floor}', headers=auth))
+        rec.time('GET /api/employees/analytics?isActive', lambda: client.request(
+            'GET', f'/api/employees/analytics?isActive=true&salaryMin={floor}', headers=auth))
+
+def workload_logins(client, rec, auth, rng, n):
+    for _ in range(n):
+        user = rng.randrange(1, 200)
+        ip = f'192.0.{rng.randrange(256)}.{rng.randrange(256)}'
+        if rng.random() < 0.3:
+            rec.time('POST /api/auth/login (bad)', lambda: client.request(
+                'POST', '/api/auth/login', {'email': f'user{user}@bench.example', 'password': 'wrong'},
+                remote_addr=ip))
+        else:
+            rec.time('POST /api/auth/login', lambda: client.request(
+                'POST', '/api/auth/login', {'email': f'user{user}@bench.example', 'password': BENCH_PASSWORD},
+                remote_addr=ip))
+
+def workload_crud(client, rec, auth, rng, n):
+    for i in range(n):
+        marker = f'{threading.get_ident()}-{i}-{rng.randrange(10 ** 9)}'
+        status, body = rec.time('POST /api/employees', lambda: client.request(
+            'POST', '/api/employees', {'first_name': 'Bench', 'last_name': 'Crud', 'email': f'crud-{marker}@bench.example',
+                                       'department': rng.choice(DEPARTMENTS), 'salary': 50000}, headers=auth))
+        if status != 201:
+            continue
+        emp_id = body['id']
+        rec.time('GET /api/employees/<id>', lambda: client.request('GET', f'/api/employees/{emp_id}', headers=auth))
+        rec.time('PUT /api/employees/<id>', lambda: client.request(
+            'PUT', f'/api/employees/{emp_id}', {'salary': 60000, 'position': 'Engineer'}, headers=auth))
+        rec.time('DELETE /api/employees/<id>', lambda: client.request(
+            'DELETE', f'/api/employees/{emp_id}', headers=auth))
+
+WORKLOADS = {
+    'list': (workload_list, 1.0),
+    'search': (workload_search, 1.0),
+    'statistics': (workload_statistics, 1.0),
+    'analytics': (workload_analytics, 0.5),
+    'logins': (workload_logins, 0.1),   # KDF-bound, far fewer iterations
+    'crud': (workload_crud, 0.25),
+}
+
+def run(client, workloads, requests, concurrency, seed_value=42):
+    """Run workloads sequentially, each with `concurrency` threads; returns the report"""
+    token = login_token(client)
+    auth = {'Authorization': f'Bearer {token}'}
+    report = {}
+    for name in workloads:
+        fn, weight = WORKLOADS[name]
+        per_thread = max(1, int(requests * weight) // concurrency)
+        rec = Recorder()
+        threads = [threading.Thread(target=fn, args=(client, rec, auth, random.Random(seed_value + t), per_thread))
+                   for t in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        routes = {}
+        for label, samples in sorted(rec.samples.items()):
+            ordered = sorted(samples)
+            routes[label] = {
+                'count': len(ordered),
+                'errors': rec.errors.get(label, 0),
+                'throughput_rps': round(len(ordered) / wall, 2) if wall else 0,
+                'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3),
+            }
+        report[name] = {'wall_seconds': round(wall, 3), 'routes': routes}
+        print(f'✓ {name}: {sum(r["count"] for r in routes.values())} requests in {wall:.2f}s')
+    return report
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(before_path, after_path):
+    """Print p50/p95 change per route between two result files"""
+    with open(before_path) as f:
+        before = json.load(f)['workloads']
+    with open(after_path) as f:
+        after = json.load(f)['workloads']
+    print(f"{'route':55} {'p50 before':>11} {'p50 after':>10} {'p95 before':>11} {'p95 after':>10} {'Δp95':>8}")
+    for workload, result in after.items():
+        for label, stats in result['routes'].items():
+            old = before.get(workload, {}).get('routes', {}).get(label)
+            if not old:
+                continue
+            delta = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+            print(f"{label[:55]:55} {old['p50_ms']:>11.2f} {stats['p50_ms']:>10.2f} "
+                  f"{old['p95_ms']:>11.2f} {stats['p95_ms']:>10.2f} {delta:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = sub.add_parser('seed', help='create a scratch database with synthetic data')
+    seed_parser.add_argument('--db', required=True)
+    seed_parser.add_argument('--scale', choices=SCALES, help='employee count preset')
+    seed_parser.add_argument('--employees', type=int, default=10_000)
+    seed_parser.add_argument('--users', type=int, default=200)
+    seed_parser.add_argument('--logins', type=int, help='login_attempts rows (default 2x employees)')
+    seed_parser.add_argument('--password-logs', type=int, help='password_logs rows (default 5x users)')
+    seed_parser.add_argument('--seed', type=int, default=42)
+
+    run_parser = sub.add_parser('run', help='run workloads and write results JSON')
+    run_parser.add_argument('--db', help='database for the in-process test client')
+    run_parser.add_argument('--url', help='benchmark a running server instead, e.g. http://127.0.0.1:5002')
+    run_parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    run_parser.add_argument('--requests', type=int, default=500, help='base requests per workload')
+    run_parser.add_argument('--concurrency', type=int, default=4)
+    run_parser.add_argument('--out', default='bench_results.json')
+    run_parser.add_argument('--seed', type=int, default=42)
+
+    compare_parser = sub.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        employees = SCALES[args.scale] if args.scale else args.employees
+        started = time.perf_counter()
+        counts = seed(args.db, employees, args.users, args.logins, args.password_logs, seed_value=args.seed)
+        print(f'✓ Seeded {args.db} in {time.perf_counter() - started:.1f}s: {counts}')
+        print(f'  Bench login: user0@bench.example / {BENCH_PASSWORD}')
+
+    elif args.command == 'run':
+        if not args.url and not args.db:
+            parser.error('run needs --db or --url')
+        workloads = [w for w in args.workloads.split(',') if w]
+        unknown = set(workloads) - set(WORKLOADS)
+        if unknown:
+            parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+        client = HttpClient(args.url) if args.url else TestClient(args.db)
+        report = run(client, workloads, args.requests, args.concurrency, args.seed)
+        result = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'target': args.url or 'flask-test-client',
+                'db': args.db,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+            },
+            'workloads': report,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'✓ Results written to {args.out}')
+
+    else:
+        compare(args.before, args.after)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Database connection pool
+Keeps a bounded set of long-lived SQLite connections opened in WAL mode
+so routes no longer pay connect/PRAGMA overhead on every request
+"""
+
+import contextvars
+import sqlite3
+import threading
+import time
+
+# PRAGMAs applied once when a pooled connection is opened
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'cache_size': -16000,       # negative = KiB, ~16 MB page cache per connection
+    'mmap_size': 134217728,     # 128 MB memory-mapped I/O
+    'busy_timeout': 5000,       # ms to wait on a locked database before failing
+    'temp_store': 'MEMORY',
+}
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout"""
+
+class QueryStats:
+    """SQL counters for one request"""
+
+    __slots__ = ('queries', 'rows', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+# Set by the request middleware; cursors record into it when present
+active_query_stats = contextvars.ContextVar('active_query_stats', default=None)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that counts statements, rows and time spent in SQLite"""
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters, True)
+
+    def _timed(self, run, sql, parameters, many):
+        stats = active_query_stats.get()
+        slow_log = getattr(self.connection, 'slow_query_log', None)
+        if stats is None and slow_log is None:
+            return run(sql, parameters)
+        started = time.perf_counter()
+        result = run(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+            if (many or self.description is None) and self.rowcount > 0:
+                stats.rows += self.rowcount
+        if slow_log is not None and elapsed >= slow_log.threshold:
+            slow_log.record(self.connection, sql, parameters, elapsed, many=many)
+        return result
+
+    def _fetch(self, fetch, *args):
+        stats = active_query_stats.get()
+        if stats is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        result = fetch(*args)
+        stats.seconds += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is not None:
+            self._count_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(super().fetchmany, self.arraysize if size is None else size)
+        self._count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._count_rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = self._fetch(super().__next__)
+        self._count_rows(1)
+        return row
+
+    @staticmethod
+    def _count_rows(n):
+        stats = active_query_stats.get()
+        if stats is not None:
+            stats.rows += n
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool
+
+    While `scoped` is set the connection belongs to the current request and
+    close() is a no-op; the request teardown releases it.
+    """
+
+    pool = None
+    scoped = False
+    leased = False
+    slow_query_log = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        # Connection.execute() goes through here too
+        return super().cursor(factory)
+
+    def close(self):
+        """Return connection to the pool instead of closing it"""
+        if self.pool is None:
+            super().close()
+        elif not self.scoped:
+            self.pool.release(self)
+
+    def really_close(self):
+        """Close the underlying SQLite handle"""
+        super().close()
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared between request threads"""
+
+    def __init__(self, path, size=8, timeout=10.0, pragmas=None, slow_query_log=None, on_connect=None):
+        self.path = path
+        self.slow_query_log = slow_query_log
+        self.on_connect = on_connect    # extra per-connection setup, e.g. TEMP triggers
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        self._idle = []
+        self._opened = 0
+        self._cond = threading.Condition()
+
+        # Stats
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def _connect(self):
+        """Open a new connection and apply PRAGMAs"""
+        conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False,
+                               timeout=self.pragmas['busy_timeout'] / 1000)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.pool = self
+        conn.slow_query_log = self.slow_query_log
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds when exhausted"""
+        with self._cond:
+            if not self._idle and self._opened >= self.size:
+                self.waits += 1
+                started = time.perf_counter()
+                deadline = started + self.timeout
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                    self._cond.wait(remaining)
+                self.wait_time += time.perf_counter() - started
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._opened += 1
+                conn = None
+
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self.in_use -= 1
+                    self._cond.notify()
+                raise
+        conn.leased = True
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if not conn.leased:
+            return
+        conn.leased = False
+        conn.scoped = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken handle - drop it and let the pool open a fresh one
+            conn.really_close()
+            with self._cond:
+                self._opened -= 1
+                self.in_use -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self.in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            while self._idle:
+                self._idle.pop().really_close()
+                self._opened -= 1
+
+    def stats(self):
+        """Snapshot of pool counters"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'opened': self._opened,
+                'idle': len(self._idle),
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time_ms': round(self.wait_time * 1000, 3),
+            }
@@ -0,0 +1,196 @@
+"""
+Employee change feed
+In-process fan-out of compact change events (created / updated / archived /
+restored / reset) to Server-Sent Events clients. Write routes record events
+while they run and the data_versions listener publishes them after commit.
+
+Every client has a bounded buffer: a client that falls behind gets a single
+`reset` event (refetch) instead of unbounded memory. Recent events stay in a
+ring so a reconnecting client resumes from its Last-Event-ID.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+class Subscriber:
+    """One connected client's pending (id, event) entries"""
+
+    __slots__ = ('entries', 'max_buffer', 'overflows')
+
+    def __init__(self, max_buffer):
+        self.entries = deque()
+        self.max_buffer = max_buffer
+        self.overflows = 0
+
+    def push(self, entry):
+        if len(self.entries) >= self.max_buffer:
+            # Too far behind: replace the backlog with one reset at this position
+            self.entries.clear()
+            self.overflows += 1
+            entry = (entry[0], {'type': 'reset', 'reason': 'overflow'})
+        self.entries.append(entry)
+
+class ChangeBus:
+    """Publishes change events to subscribers; thread safe
+
+    Event ids are '<epoch>-<seq>'. The epoch is random per process and is
+    drawn again in a forked child, so an id from a previous run or from
+    another prefork worker never matches this ring and resumes as a reset.
+    """
+
+    def __init__(self, ring_size=1000, max_buffer=256, max_subscribers=100, gap_grace=1.0):
+        self.max_buffer = max_buffer
+        self.max_subscribers = max_subscribers
+        self.gap_grace = gap_grace
+        self._cond = threading.Condition()
+        self._ring = deque(maxlen=ring_size)
+        self._subscribers = set()
+        self._new_epoch()
+        self._closed = False
+
+        # Employees versions seen through this process's bumps
+        self._synced = None
+        self._ahead = set()
+        self._gap_since = None
+
+        # Stats
+        self.published = 0
+        self.resets = 0
+
+        # prefork imports the app (and this bus) in the master before forking workers
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._new_epoch)
+
+    def _new_epoch(self):
+        self.epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._ring.clear()
+
+    def event_id(self, seq):
+        return f'{self.epoch}-{seq}'
+
+    def parse_event_id(self, event_id):
+        """Sequence number of an id issued by this process, else None"""
+        epoch, _, seq = (event_id or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    # ----- publishing -----
+
+    def publish(self, events, version=None):
+        """Fan events (dicts with a 'type') out to every subscriber
+
+        version is the employees data version the events belong to.
+        """
+        with self._cond:
+            for event in events:
+                self._seq += 1
+                entry = (self._seq, event)
+                self._ring.append(entry)
+                for subscriber in self._subscribers:
+                    subscriber.push(entry)
+                self.published += 1
+                if event['type'] == 'reset':
+                    self.resets += 1
+            if version is not None:
+                self._applied(version)
+            self._cond.notify_all()
+
+    def _applied(self, version):
+        if self._synced is None:
+            self._synced = version
+        elif version > self._synced:
+            self._ahead.add(version)
+        while self._synced + 1 in self._ahead:
+            self._synced += 1
+            self._ahead.discard(self._synced)
+
+    def check_version(self, current):
+        """Turn writes this process never saw (another worker's) into a reset event
+
+        A gap between the shared employees version and the versions published
+        here must persist for gap_grace seconds, so a local bump still on its
+        way to publish() is not mistaken for a foreign one.
+        """
+        with self._cond:
+            if self._synced is None:
+                self._synced = current
+            if current <= self._synced:
+                self._gap_since = None
+                return
+            now = time.monotonic()
+            if self._gap_since is None:
+                self._gap_since = now
+            if now - self._gap_since < self.gap_grace:
+                return
+            self._synced = current
+            self._ahead = {v for v in self._ahead if v > current}
+            self._gap_since = None
+        self.publish([{'type': 'reset', 'reason': 'external'}])
+
+    # ----- subscribing -----
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; returns None when the subscriber limit is reached
+
+        With last_event_id (the client's Last-Event-ID string), events after
+        it are queued from the ring, or a reset when the id comes from another
+        process or run, or has already left the ring.
+        """
+        subscriber = Subscriber(self.max_buffer)
+        with self._cond:
+            if self._closed or len(self._subscribers) >= self.max_subscribers:
+                return None
+            last_seq = self.parse_event_id(last_event_id) if last_event_id is not None else self._seq
+            if last_seq != self._seq:
+                oldest = self._ring[0][0] if self._ring else self._seq + 1
+                if last_seq is not None and oldest - 1 <= last_seq < self._seq:
+                    for entry in self._ring:
+                        if entry[0] > last_seq:
+                            subscriber.push(entry)
+                else:
+                    subscriber.push((self._seq, {'type': 'reset', 'reason': 'resume'}))
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._cond:
+            self._subscribers.discard(subscriber)
+
+    def wait(self, subscriber, timeout):
+        """Pending (id, event) entries, blocking up to timeout; None once the bus is closed"""
+        with self._cond:
+            if not subscriber.entries and not self._closed:
+                self._cond.wait(timeout)
+            if self._closed and not subscriber.entries:
+                return None
+            entries = list(subscriber.entries)
+            subscriber.entries.clear()
+        return entries
+
+    def close(self):
+        """End every stream (worker shutdown)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def format(self, entry):
+        """One SSE message"""
+        seq, event = entry
+        return f"id: {self.event_id(seq)}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    def stats(self):
+        with self._cond:
+            return {
+                'subscribers': len(self._subscribers),
+                'last_event_id': self.event_id(self._seq),
+                'ring': len(self._ring),
+                'published': self.published,
+                'resets': self.resets,
+                'overflowed_clients': sum(1 for s in self._subscribers if s.overflows),
+            }
@@ -0,0 +1,143 @@
+"""
+Password hashing executor
+Runs the deliberately slow KDF calls in a bounded process pool so a burst
+of logins cannot hold the GIL and stall cheap requests
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full or the pool cannot answer in time"""
+
+def _timed_hash(password, method):
+    return time.time(), generate_password_hash(password, method=method)
+
+def _timed_check(pwhash, password):
+    return time.time(), check_password_hash(pwhash, password)
+
+class PasswordHasher:
+    """Hash/verify passwords in worker processes with a bounded queue
+
+    workers=0 runs inline on the calling thread (handy for scripts and
+    debugging). When more than `max_pending` calls are queued, new calls
+    fail fast with HasherBusy; so do calls that time out or hit a broken
+    pool (which is replaced on the next call).
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=32, timeout=30):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._method_prefix = None
+
+        # Metrics (seconds), recent samples for percentiles
+        self._latencies = deque(maxlen=1000)
+        self._waits = deque(maxlen=1000)
+        self.calls = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that already runs request/audit threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy('Password hashing queue is full')
+        submitted = time.time()
+        try:
+            with self._lock:
+                self._pending += 1
+            if self.workers:
+                started, result = self._submit(fn, *args)
+            else:
+                started, result = fn(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+        finished = time.time()
+        with self._lock:
+            self.calls += 1
+            self._waits.append(max(started - submitted, 0.0))
+            self._latencies.append(finished - submitted)
+        return result
+
+    def _submit(self, fn, *args):
+        executor = self._pool()
+        try:
+            future = executor.submit(fn, *args)
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.failed += 1
+            raise HasherBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            # A worker died (OOM kill, ...): replace the pool for later calls
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.failed += 1
+            raise HasherBusy('Password hashing pool failed')
+
+    def hash(self, password):
+        return self._run(_timed_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(_timed_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when a stored hash was made with a different method/cost than configured
+
+        The method may omit parameters ('scrypt', 'pbkdf2:sha256'); the stored
+        prefix always has them, so compare with the prefix of a probe hash.
+        """
+        if self._method_prefix is None:
+            self._method_prefix = self.hash('rehash-probe').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        def percentiles(samples):
+            ordered = sorted(samples)
+            if not ordered:
+                return {'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+            pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+            return {'p50_ms': round(pick(0.5) * 1000, 2),
+                    'p95_ms': round(pick(0.95) * 1000, 2),
+                    'max_ms': round(ordered[-1] * 1000, 2)}
+
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'latency': percentiles(self._latencies),
+                'queue_wait': percentiles(self._waits),
+            }
@@ -0,0 +1,172 @@
+"""
+Log table partitioning
+Keeps login_attempts / password_logs small by moving older months into
+per-month partition tables (exposed together through <table>_all views),
+rolling expired months up into daily summaries and archiving their raw
+rows to compressed NDJSON files
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+# table -> time column and the daily rollup it feeds
+LOG_TABLES = {
+    'login_attempts': {
+        'time_column': 'last_attempt_time',
+        'rollup': '''
+            INSERT INTO login_attempts_daily
+                (day, email, ip_address, user_id, attempts, failures, successes, lockouts)
+            SELECT date(last_attempt_time), email, COALESCE(ip_address, ''), MAX(user_id),
+                   COUNT(*), SUM(attempt_count > 0), SUM(attempt_count = 0), SUM(is_locked = 1)
+            FROM {partition}
+            WHERE last_attempt_time IS NOT NULL
+            GROUP BY date(last_attempt_time), email, COALESCE(ip_address, '')
+            ON CONFLICT(day, email, ip_address) DO UPDATE SET
+                attempts = attempts + excluded.attempts,
+                failures = failures + excluded.failures,
+                successes = successes + excluded.successes,
+                lockouts = lockouts + excluded.lockouts
+        ''',
+    },
+    'password_logs': {
+        'time_column': 'timestamp',
+        'rollup': '''
+            INSERT INTO password_logs_daily (day, user_id, action, module, events)
+            SELECT date(timestamp), COALESCE(user_id, 0), action, COALESCE(module, ''), COUNT(*)
+            FROM {partition}
+            WHERE timestamp IS NOT NULL
+            GROUP BY date(timestamp), COALESCE(user_id, 0), action, COALESCE(module, '')
+            ON CONFLICT(day, user_id, action, module) DO UPDATE SET
+                events = events + excluded.events
+        ''',
+    },
+}
+
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS login_attempts_daily (
+        day DATE NOT NULL,
+        email TEXT NOT NULL,
+        ip_address TEXT NOT NULL,
+        user_id INTEGER,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        failures INTEGER NOT NULL DEFAULT 0,
+        successes INTEGER NOT NULL DEFAULT 0,
+        lockouts INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, email, ip_address)
+    );
+    CREATE INDEX IF NOT EXISTS idx_login_attempts_daily_user ON login_attempts_daily(user_id, day);
+    CREATE TABLE IF NOT EXISTS password_logs_daily (
+        day DATE NOT NULL,
+        user_id INTEGER NOT NULL,  -- 0 for rows whose user has since been deleted
+        action TEXT NOT NULL,
+        module TEXT NOT NULL,
+        events INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, user_id, action, module)
+    );
+'''
+
+def month_key(dt):
+    return dt.year * 100 + dt.month
+
+def add_months(dt, months):
+    """First day of the month `months` away from dt's month"""
+    index = dt.year * 12 + (dt.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partitions(conn, table):
+    """Existing monthly partitions of a table as sorted [(yyyymm, name)]"""
+    pattern = re.compile(rf'^{table}_(\d{{6}})$')
+    found = []
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                                (f'{table}_%',)):
+        match = pattern.match(name)
+        if match:
+            found.append((int(match.group(1)), name))
+    return sorted(found)
+
+def rebuild_views(conn, table):
+    """(Re)create <table>_all as the hot table UNION ALL every partition"""
+    sources = [table] + [name for _, name in partitions(conn, table)]
+    conn.execute(f'DROP VIEW IF EXISTS {table}_all')
+    conn.execute(f"CREATE VIEW {table}_all AS " +
+                 ' UNION ALL '.join(f'SELECT * FROM {source}' for source in sources))
+
+def rotate(conn, table, hot_cutoff):
+    """Move rows older than hot_cutoff out of the hot table into monthly partitions"""
+    time_column = LOG_TABLES[table]['time_column']
+    cutoff = hot_cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    months = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT strftime('%Y%m', {time_column}) FROM {table} "
+        f"WHERE {time_column} < ? AND {time_column} IS NOT NULL", (cutoff,)) if row[0]]
+
+    moved = {}
+    for month in sorted(months):
+        start = datetime(int(month[:4]), int(month[4:]), 1)
+        bounds = (start.strftime('%Y-%m-%d %H:%M:%S'),
+                  add_months(start, 1).strftime('%Y-%m-%d %H:%M:%S'))
+        partition = f'{table}_{month}'
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {partition} AS SELECT * FROM {table} WHERE 0')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{partition}_time ON {partition}({time_column})')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{partition}_user ON {partition}(user_id, {time_column})')
+        cursor = conn.execute(f'INSERT INTO {partition} SELECT * FROM {table} '
+                              f'WHERE {time_column} >= ? AND {time_column} < ?', bounds)
+        conn.execute(f'DELETE FROM {table} WHERE {time_column} >= ? AND {time_column} < ?', bounds)
+        moved[partition] = cursor.rowcount
+    return moved
+
+def archive_partition(conn, partition, archive_dir):
+    """Write a partition's rows to <archive_dir>/<partition>.ndjson.gz; returns the path"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f'{partition}.ndjson.gz')
+    tmp_path = path + '.tmp'
+    cursor = conn.execute(f'SELECT * FROM {partition} ORDER BY id')
+    columns = [d[0] for d in cursor.description]
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as out:
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            out.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+def expire(conn, table, retention_cutoff, archive_dir):
+    """Roll up, archive and drop partitions for months before retention_cutoff"""
+    expired = []
+    for month, partition in partitions(conn, table):
+        if month >= month_key(retention_cutoff):
+            continue
+        path = archive_partition(conn, partition, archive_dir)
+        conn.execute(LOG_TABLES[table]['rollup'].format(partition=partition))
+        conn.execute(f'DROP TABLE {partition}')
+        expired.append({'partition': partition, 'archive': path})
+    return expired
+
+def run_maintenance(conn, archive_dir, hot_months=2, retention_months=12, now=None):
+    """Rotate, expire and re-view every log table in one transaction
+
+    hot_months       - months (including the current one) kept in the hot table
+    retention_months - months of raw rows kept before rollup + archival
+    """
+    now = now or datetime.utcnow()
+    hot_cutoff = add_months(now, -(hot_months - 1))
+    retention_cutoff = add_months(now, -(retention_months - 1))
+    report = {}
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table in LOG_TABLES:
+            moved = rotate(conn, table, hot_cutoff)
+            expired = expire(conn, table, retention_cutoff, archive_dir)
+            rebuild_views(conn, table)
+            report[table] = {'moved': moved, 'expired': expired}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return report
@@ -0,0 +1,119 @@
+"""
+Request metrics
+Per-endpoint latency histograms, status counts, in-flight gauges and SQL
+counters, rendered in the Prometheus text exposition format
+"""
+
+import threading
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RequestMetrics:
+    """Thread-safe registry fed by the request middleware in app.py
+
+    Endpoints are labelled by Flask endpoint name (unmatched URLs share one
+    label), which keeps label cardinality bounded.
+    """
+
+    def __init__(self, prefix='ems'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._requests = {}       # (endpoint, method, status) -> count
+        self._latency = {}        # endpoint -> Histogram (seconds)
+        self._queries = {}        # endpoint -> Histogram (statements per request)
+        self._sql = {}            # endpoint -> [queries, rows, seconds]
+        self._in_flight = {}      # endpoint -> gauge
+
+    def started(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def finished(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 1) - 1
+
+    def observe(self, endpoint, method, status, seconds, query_stats):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if endpoint not in self._latency:
+                self._latency[endpoint] = Histogram(LATENCY_BUCKETS)
+                self._queries[endpoint] = Histogram(QUERY_BUCKETS)
+                self._sql[endpoint] = [0, 0, 0.0]
+            self._latency[endpoint].observe(seconds)
+            self._queries[endpoint].observe(query_stats.queries)
+            sql = self._sql[endpoint]
+            sql[0] += query_stats.queries
+            sql[1] += query_stats.rows
+            sql[2] += query_stats.seconds
+
+    def render(self, extra_gauges=None):
+        """Prometheus text format; extra_gauges maps metric name -> (help, value)"""
+        p = self.prefix
+        out = []
+        with self._lock:
+            out += [f'# HELP {p}_http_requests_total Requests by endpoint, method and status',
+                    f'# TYPE {p}_http_requests_total counter']
+            for (endpoint, method, status), n in sorted(self._requests.items()):
+                out.append(f'{p}_http_requests_total{{endpoint="{_escape(endpoint)}",'
+                           f'method="{method}",status="{status}"}} {n}')
+
+            out += [f'# HELP {p}_http_requests_in_flight Requests currently being handled',
+                    f'# TYPE {p}_http_requests_in_flight gauge']
+            for endpoint, n in sorted(self._in_flight.items()):
+                out.append(f'{p}_http_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {n}')
+
+            out += [f'# HELP {p}_http_request_duration_seconds Request latency',
+                    f'# TYPE {p}_http_request_duration_seconds histogram']
+            for endpoint, hist in sorted(self._latency.items()):
+                out += hist.lines(f'{p}_http_request_duration_seconds', f'endpoint="{_escape(endpoint)}"')
+
+            out += [f'# HELP {p}_sql_queries_per_request SQL statements executed per request',
+                    f'# TYPE {p}_sql_queries_per_request histogram']
+            for endpoint, hist in sorted(self._queries.items()):
+                out += hist.lines(f'{p}_sql_queries_per_request', f'endpoint="{_escape(endpoint)}"')
+
+            for index, (name, kind, help_text) in enumerate((
+                    ('sql_queries_total', 'counter', 'SQL statements executed'),
+                    ('sql_rows_total', 'counter', 'Rows fetched or modified by SQL statements'),
+                    ('sql_seconds_total', 'counter', 'Time spent inside SQLite'))):
+                out += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} {kind}']
+                for endpoint, sql in sorted(self._sql.items()):
+                    value = f'{sql[index]:.6f}' if index == 2 else sql[index]
+                    out.append(f'{p}_{name}{{endpoint="{_escape(endpoint)}"}} {value}')
+
+        for name, (help_text, value) in (extra_gauges or {}).items():
+            out += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} gauge', f'{p}_{name} {value}']
+        return '\n'.join(out) + '\n'
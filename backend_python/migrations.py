@@ -0,0 +1,461 @@
+"""
+Database schema migrations
+Numbered migrations applied once each, tracked with PRAGMA user_version
+"""
+
+import sqlite3
+from werkzeug.security import generate_password_hash
+from log_partitions import LOG_TABLES, ROLLUP_SCHEMA, rebuild_views
+
+BASE_SCHEMA = '''
+    -- Users
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT DEFAULT 'user',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Employees
+    CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        department TEXT,
+        position TEXT,
+        salary REAL,
+        phone TEXT,
+        hire_date DATE,
+        address TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Password change log
+    CREATE TABLE IF NOT EXISTS password_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        changed_by_user_id INTEGER,
+        changed_by_name TEXT,
+        module TEXT,
+        old_password_hash TEXT,
+        new_password_hash TEXT,
+        ip_address TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (changed_by_user_id) REFERENCES users(id)
+    );
+
+    -- Login attempts
+    CREATE TABLE IF NOT EXISTS login_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        email TEXT NOT NULL,
+        attempt_count INTEGER DEFAULT 1,
+        last_attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_locked INTEGER DEFAULT 0,
+        cooldown_until TIMESTAMP,
+        ip_address TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+
+    -- Soft-deleted employees archive
+    CREATE TABLE IF NOT EXISTS deleted_employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT,
+        department TEXT,
+        position TEXT,
+        salary REAL,
+        phone TEXT,
+        hire_date DATE,
+        address TEXT,
+        deleted_by_user_id INTEGER,
+        deleted_by_name TEXT,
+        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        deletion_reason TEXT,
+        FOREIGN KEY (deleted_by_user_id) REFERENCES users(id)
+    );
+'''
+
+EMPLOYEE_FTS_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+        first_name, last_name, email, position, department, address,
+        content='employees', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+        INSERT INTO employees_fts(rowid, first_name, last_name, email, position, department, address)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.position, new.department, new.address);
+    END;
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+        INSERT INTO employees_fts(employees_fts, rowid, first_name, last_name, email, position, department, address)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.position, old.department, old.address);
+    END;
+    CREATE TRIGGER IF NOT EXISTS employees_fts_au AFTER UPDATE ON employees BEGIN
+        INSERT INTO employees_fts(employees_fts, rowid, first_name, last_name, email, position, department, address)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.position, old.department, old.address);
+        INSERT INTO employees_fts(rowid, first_name, last_name, email, position, department, address)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.position, new.department, new.address);
+    END;
+'''
+
+SECONDARY_INDEXES = '''
+    -- login(): lookup by email
+    CREATE INDEX IF NOT EXISTS idx_login_attempts_email ON login_attempts(email);
+    -- get_login_logs / get_user_login_logs: newest first, overall and per user
+    CREATE INDEX IF NOT EXISTS idx_login_attempts_time ON login_attempts(last_attempt_time);
+    CREATE INDEX IF NOT EXISTS idx_login_attempts_user_time ON login_attempts(user_id, last_attempt_time);
+    -- get_password_logs / get_user_password_logs
+    CREATE INDEX IF NOT EXISTS idx_password_logs_time ON password_logs(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_password_logs_user_time ON password_logs(user_id, timestamp);
+    -- get_deleted_employees: ORDER BY deleted_at
+    CREATE INDEX IF NOT EXISTS idx_deleted_employees_deleted_at ON deleted_employees(deleted_at);
+    -- get_employees filters; expression index matches the default created_at keyset sort
+    CREATE INDEX IF NOT EXISTS idx_employees_department_active ON employees(department, is_active);
+    CREATE INDEX IF NOT EXISTS idx_employees_active ON employees(is_active);
+    CREATE INDEX IF NOT EXISTS idx_employees_created_sort ON employees(COALESCE(created_at, ''), id);
+'''
+
+# Per-department aggregates kept current by triggers so statistics reads are
+# O(departments). NULL departments are folded into ''.
+EMPLOYEE_STATS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS employee_stats (
+        department TEXT PRIMARY KEY,
+        headcount INTEGER NOT NULL DEFAULT 0,
+        active INTEGER NOT NULL DEFAULT 0,
+        salary_sum REAL NOT NULL DEFAULT 0,
+        salary_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER IF NOT EXISTS employee_stats_ai AFTER INSERT ON employees BEGIN
+        INSERT INTO employee_stats (department, headcount, active, salary_sum, salary_count)
+        VALUES (COALESCE(new.department, ''), 1, new.is_active = 1, COALESCE(new.salary, 0), new.salary IS NOT NULL)
+        ON CONFLICT(department) DO UPDATE SET
+            headcount = headcount + 1,
+            active = active + excluded.active,
+            salary_sum = salary_sum + excluded.salary_sum,
+            salary_count = salary_count + excluded.salary_count;
+    END;
+    CREATE TRIGGER IF NOT EXISTS employee_stats_ad AFTER DELETE ON employees BEGIN
+        UPDATE employee_stats SET
+            headcount = headcount - 1,
+            active = active - (old.is_active = 1),
+            salary_sum = salary_sum - COALESCE(old.salary, 0),
+            salary_count = salary_count - (old.salary IS NOT NULL)
+        WHERE department = COALESCE(old.department, '');
+        DELETE FROM employee_stats WHERE department = COALESCE(old.department, '') AND headcount <= 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS employee_stats_au AFTER UPDATE OF department, salary, is_active ON employees BEGIN
+        UPDATE employee_stats SET
+            headcount = headcount - 1,
+            active = active - (old.is_active = 1),
+            salary_sum = salary_sum - COALESCE(old.salary, 0),
+            salary_count = salary_count - (old.salary IS NOT NULL)
+        WHERE department = COALESCE(old.department, '');
+        DELETE FROM employee_stats WHERE department = COALESCE(old.department, '') AND headcount <= 0;
+        INSERT INTO employee_stats (department, headcount, active, salary_sum, salary_count)
+        VALUES (COALESCE(new.department, ''), 1, new.is_active = 1, COALESCE(new.salary, 0), new.salary IS NOT NULL)
+        ON CONFLICT(department) DO UPDATE SET
+            headcount = headcount + 1,
+            active = active + excluded.active,
+            salary_sum = salary_sum + excluded.salary_sum,
+            salary_count = salary_count + excluded.salary_count;
+    END;
+'''
+
+EMPLOYEE_STATS_QUERY = '''
+    SELECT COALESCE(department, '') AS department,
+           COUNT(*) AS headcount,
+           SUM(is_active = 1) AS active,
+           COALESCE(SUM(salary), 0) AS salary_sum,
+           COUNT(salary) AS salary_count
+    FROM employees
+    GROUP BY COALESCE(department, '')
+'''
+
+# Delta sync: one row per employee id holding the sequence number of its
+# latest change. The sequence is taken inside the writing transaction, and
+# SQLite has a single writer, so sequence order is commit order - unlike
+# updated_at, which has second resolution and is set before commit.
+# Deleted ids stay as tombstones; restoring an archived employee inserts a
+# new id and re-sequences the old id's tombstone with restored_as.
+EMPLOYEE_CHANGES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS employee_changes (
+        employee_id INTEGER PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        deleted_at TIMESTAMP,
+        archive_id INTEGER,
+        restored_as INTEGER
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_employee_changes_seq ON employee_changes(seq);
+    -- Tombstones look up the archive entry an employee was moved to
+    CREATE INDEX IF NOT EXISTS idx_deleted_employees_employee ON deleted_employees(employee_id);
+    CREATE TRIGGER IF NOT EXISTS employee_changes_ai AFTER INSERT ON employees BEGIN
+        INSERT INTO employee_changes (employee_id, seq)
+        VALUES (new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM employee_changes))
+        ON CONFLICT(employee_id) DO UPDATE SET
+            seq = excluded.seq, deleted_at = NULL, archive_id = NULL, restored_as = NULL;
+    END;
+    CREATE TRIGGER IF NOT EXISTS employee_changes_au AFTER UPDATE ON employees BEGIN
+        INSERT INTO employee_changes (employee_id, seq)
+        VALUES (new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM employee_changes))
+        ON CONFLICT(employee_id) DO UPDATE SET
+            seq = excluded.seq, deleted_at = NULL, archive_id = NULL, restored_as = NULL;
+    END;
+    CREATE TRIGGER IF NOT EXISTS employee_changes_ad AFTER DELETE ON employees BEGIN
+        INSERT INTO employee_changes (employee_id, seq, deleted_at, archive_id)
+        VALUES (old.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM employee_changes),
+                COALESCE((SELECT deleted_at FROM deleted_employees WHERE employee_id = old.id
+                          ORDER BY id DESC LIMIT 1), CURRENT_TIMESTAMP),
+                (SELECT MAX(id) FROM deleted_employees WHERE employee_id = old.id))
+        ON CONFLICT(employee_id) DO UPDATE SET
+            seq = excluded.seq, deleted_at = excluded.deleted_at,
+            archive_id = excluded.archive_id, restored_as = NULL;
+    END;
+    -- Archive entries are only deleted by a restore, after the new row is inserted
+    CREATE TRIGGER IF NOT EXISTS employee_changes_restore AFTER DELETE ON deleted_employees BEGIN
+        UPDATE employee_changes SET
+            seq = (SELECT MAX(seq) + 1 FROM employee_changes),
+            restored_as = (SELECT id FROM employees WHERE email = old.email)
+        WHERE employee_id = old.employee_id AND archive_id = old.id;
+    END;
+'''
+
+# Log and archive rows outlive the user they mention: deleting a user keeps
+# its audit history and clears the reference. password_logs.user_id loses
+# NOT NULL for the same reason. {name} is the table being created.
+USER_REFERENCE_TABLES = {
+    'password_logs': ('''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT NOT NULL,
+            changed_by_user_id INTEGER,
+            changed_by_name TEXT,
+            module TEXT,
+            old_password_hash TEXT,
+            new_password_hash TEXT,
+            ip_address TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+            FOREIGN KEY (changed_by_user_id) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''', ('user_id', 'changed_by_user_id')),
+    'login_attempts': ('''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            email TEXT NOT NULL,
+            attempt_count INTEGER DEFAULT 1,
+            last_attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_locked INTEGER DEFAULT 0,
+            cooldown_until TIMESTAMP,
+            ip_address TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''', ('user_id',)),
+    'deleted_employees': ('''
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT,
+            department TEXT,
+            position TEXT,
+            salary REAL,
+            phone TEXT,
+            hire_date DATE,
+            address TEXT,
+            deleted_by_user_id INTEGER,
+            deleted_by_name TEXT,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deletion_reason TEXT,
+            FOREIGN KEY (deleted_by_user_id) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''', ('deleted_by_user_id',)),
+}
+
+def run_script(conn, script):
+    """Execute a multi-statement script inside the caller's transaction
+
+    Unlike executescript() this does not COMMIT first, so a migration
+    either applies completely or not at all.
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                conn.execute(statement)
+            statement = ''
+    if statement.strip() and statement.strip() != ';':
+        conn.execute(statement)
+
+def create_base_schema(conn):
+    run_script(conn, BASE_SCHEMA)
+
+def create_employee_fts(conn):
+    already_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'employees_fts'").fetchone()
+    run_script(conn, EMPLOYEE_FTS_SCHEMA)
+    if not already_exists:
+        conn.execute("INSERT INTO employees_fts(employees_fts) VALUES ('rebuild')")
+
+def create_secondary_indexes(conn):
+    run_script(conn, SECONDARY_INDEXES)
+    # Give the query planner statistics for the new indexes
+    conn.execute('ANALYZE')
+
+def rebuild_employee_stats(conn):
+    """Recompute employee_stats from the employees table"""
+    conn.execute('DELETE FROM employee_stats')
+    conn.execute('''
+        INSERT INTO employee_stats (department, headcount, active, salary_sum, salary_count)
+    ''' + EMPLOYEE_STATS_QUERY)
+
+def verify_employee_stats(conn):
+    """Compare employee_stats with a full recount; returns a list of drifted departments"""
+    expected = {row[0]: tuple(row[1:]) for row in conn.execute(EMPLOYEE_STATS_QUERY)}
+    actual = {row[0]: tuple(row[1:]) for row in conn.execute(
+        'SELECT department, headcount, active, salary_sum, salary_count FROM employee_stats')}
+    drift = []
+    for department in sorted(set(expected) | set(actual)):
+        if expected.get(department) != actual.get(department):
+            drift.append({'department': department,
+                          'expected': expected.get(department),
+                          'actual': actual.get(department)})
+    return drift
+
+def create_employee_stats(conn):
+    run_script(conn, EMPLOYEE_STATS_SCHEMA)
+    rebuild_employee_stats(conn)
+
+def create_employee_changes(conn):
+    run_script(conn, EMPLOYEE_CHANGES_SCHEMA)
+    # Existing rows, oldest change first; no tombstones, since no client
+    # can hold a cursor from before this table existed
+    conn.execute('''
+        INSERT OR IGNORE INTO employee_changes (employee_id, seq)
+        SELECT id, ROW_NUMBER() OVER (ORDER BY COALESCE(updated_at, created_at, ''), id)
+        FROM employees
+    ''')
+
+def rebuild_table(conn, table, create_sql, user_columns=()):
+    """Swap in a new definition of table with the same columns (SQLite cannot ALTER constraints)
+
+    Rows, indexes, triggers and the AUTOINCREMENT counter carry over.
+    user_columns pointing at users that no longer exist (written while
+    foreign keys were off) are copied as NULL.
+    """
+    staging = f'{table}_rebuild'
+    extras = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,))]
+    sequence = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    selected = [f'(SELECT id FROM users WHERE id = {column})' if column in user_columns else column
+                for column in columns]
+
+    conn.execute(create_sql.format(name=staging))
+    conn.execute(f"INSERT INTO {staging} ({', '.join(columns)}) SELECT {', '.join(selected)} FROM {table}")
+    conn.execute(f'DROP TABLE {table}')
+    # Legacy rename leaves views and other tables' triggers that name the table untouched
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        conn.execute(f'ALTER TABLE {staging} RENAME TO {table}')
+    finally:
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+    for sql in extras:
+        conn.execute(sql)
+    if sequence is not None:
+        updated = conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (sequence[0], table))
+        if updated.rowcount == 0:
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, sequence[0]))
+
+def relax_user_references(conn):
+    for table, (create_sql, user_columns) in USER_REFERENCE_TABLES.items():
+        rebuild_table(conn, table, create_sql, user_columns)
+
+def create_log_partitioning(conn):
+    run_script(conn, ROLLUP_SCHEMA)
+    for table in LOG_TABLES:
+        rebuild_views(conn, table)
+
+def seed_data(conn):
+    # Seed admin user if not exists
+    if not conn.execute('SELECT 1 FROM users WHERE email = ?', ('admin@company.com',)).fetchone():
+        hashed_pw = generate_password_hash('admin123')
+        conn.execute('''
+            INSERT INTO users (name, email, password, role)
+            VALUES (?, ?, ?, ?)
+        ''', ('Admin User', 'admin@company.com', hashed_pw, 'admin'))
+        print('✓ Admin user created: admin@company.com / admin123')
+    
+    # Seed sample employees if not exists
+    if conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0] == 0:
+        employees = [
+            ('John', 'Smith', 'john.smith@company.com', 'IT', 'Developer', 75000, '555-0101', '2022-01-15', '123 Main St'),
+            ('Sarah', 'Johnson', 'sarah.j@company.com', 'HR', 'Manager', 85000, '555-0102', '2021-06-20', '456 Oak Ave'),
+            ('Mike', 'Brown', 'mike.brown@company.com', 'Sales', 'Executive', 80000, '555-0103', '2022-03-10', '789 Pine Rd'),
+        ]
+        conn.executemany('''
+            INSERT INTO employees (first_name, last_name, email, department, position, salary, phone, hire_date, address)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', employees)
+        print(f'✓ {len(employees)} sample employees created')
+
+# (version, description, apply(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, 'base schema', create_base_schema),
+    (2, 'seed admin user and sample employees', seed_data),
+    (3, 'employee full-text search index', create_employee_fts),
+    (4, 'secondary indexes', create_secondary_indexes),
+    (5, 'trigger-maintained employee statistics', create_employee_stats),
+    (6, 'log partition views and daily rollup tables', create_log_partitioning),
+    (7, 'employee change sequence for delta sync', create_employee_changes),
+    (8, 'keep audit rows when their user is deleted', relax_user_references),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def run_migrations(conn):
+    """Apply pending migrations in order, each in its own transaction
+
+    Returns a list of (version, description) that were applied. When the
+    database is already at LATEST_VERSION this is a single PRAGMA read.
+    """
+    if schema_version(conn) >= LATEST_VERSION:
+        return []
+    
+    applied = []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for version, description, apply in MIGRATIONS:
+            # Take the write lock first so concurrent starters apply each migration once
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if schema_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append((version, description))
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Prefork API server
+Runs migrations once in the master, then forks N worker processes that
+share one listening socket (inherited fd, or one SO_REUSEPORT socket per
+worker) so request handling scales past a single GIL
+
+    python prefork.py --workers 4 --port 5002
+
+Signals to the master:
+    TERM / INT  graceful shutdown (workers finish in-flight requests)
+    HUP         graceful reload: re-exec the master on the same socket with
+                fresh code, start new workers, then retire the old ones
+"""
+
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+LISTEN_FD_ENV = 'EMS_PREFORK_LISTEN_FD'
+RETIRE_ENV = 'EMS_PREFORK_RETIRE'
+
+def open_listener(host, port, reuse_port=False, backlog=1024):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+class Worker:
+    """One forked server process; exits after max_requests or on SIGTERM"""
+
+    def __init__(self, ems, args, listener):
+        self.ems = ems
+        self.args = args
+        self.listener = listener
+        self.served = 0
+        self.active = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.limit = 0
+        if args.max_requests:
+            self.limit = args.max_requests + random.randint(0, args.max_requests_jitter)
+
+    def app(self, environ, start_response):
+        """WSGI wrapper counting served and in-flight requests"""
+        with self.lock:
+            self.served += 1
+            self.active += 1
+            recycle = self.limit and self.served == self.limit
+        if recycle:
+            self.stop()
+        try:
+            body = self.ems.app(environ, start_response)
+            try:
+                yield from body
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def stop(self, *_):
+        if self.server is not None:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def run(self):
+        from werkzeug.serving import make_server
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C is handled by the master
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        listener = self.listener or open_listener(self.args.host, self.args.port, reuse_port=True)
+        self.server = make_server(self.args.host, self.args.port, self.app,
+                                  threaded=not self.args.single_threaded, fd=listener.fileno())
+        print(f'✓ Worker {os.getpid()} started')
+        self.server.serve_forever()
+
+        deadline = time.monotonic() + self.args.graceful_timeout
+        self.ems.change_bus.close()    # end open event streams so they count as finished
+        while self.active and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.ems.audit_writer.close()
+        self.ems.password_hasher.shutdown()
+
+class Master:
+    def __init__(self, args):
+        self.args = args
+        self.workers = {}          # pid -> start time
+        self.running = True
+        self.reload_requested = False
+        self.listener = None
+
+    def start(self):
+        import app as ems
+        self.ems = ems
+
+        # Migrations run exactly once, before any worker exists
+        ems.init_db()
+        ems.db_pool.close_all()    # never share SQLite handles across fork
+        ems.data_versions.share(ems.VERSIONED_TABLES)
+        ems.login_throttle.share()     # one lockout count for all workers
+
+        if LISTEN_FD_ENV in os.environ:
+            self.listener = socket.socket(fileno=int(os.environ.pop(LISTEN_FD_ENV)))
+        elif not self.args.reuse_port:
+            self.listener = open_listener(self.args.host, self.args.port)
+
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+
+        mode = 'SO_REUSEPORT' if self.listener is None else 'shared socket'
+        print(f'✓ Master {os.getpid()}: {self.args.workers} workers on '
+              f'http://{self.args.host}:{self.args.port} ({mode})')
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        self.retire_previous()
+        self.loop()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                random.seed()
+                Worker(self.ems, self.args, self.listener).run()
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def retire_previous(self):
+        """After a reload, stop the workers the old master image started"""
+        pids = [int(p) for p in os.environ.pop(RETIRE_ENV, '').split(',') if p]
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        if pids:
+            print(f'✓ Reloaded; retiring {len(pids)} old workers')
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if started is not None and os.waitstatus_to_exitcode(status) != 0 \
+                    and time.monotonic() - started < 1:
+                time.sleep(1)    # crashing on startup: don't fork-bomb
+
+    def loop(self):
+        while self.running:
+            self.reap()
+            if self.reload_requested:
+                self.reload()
+            while self.running and len(self.workers) < self.args.workers:
+                self.spawn()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def request_stop(self, *_):
+        self.running = False
+
+    def request_reload(self, *_):
+        self.reload_requested = True
+
+    def reload(self):
+        """Re-exec with fresh code, keeping the socket and handing over the workers"""
+        env = dict(os.environ)
+        env[RETIRE_ENV] = ','.join(str(pid) for pid in self.workers)
+        if self.listener is not None:
+            self.listener.set_inheritable(True)
+            env[LISTEN_FD_ENV] = str(self.listener.fileno())
+        print(f'✓ Master {os.getpid()}: reloading')
+        sys.stdout.flush()
+        os.execve(sys.executable, [sys.executable] + sys.argv, env)
+
+    def shutdown(self):
+        print(f'✓ Master {os.getpid()}: stopping {len(self.workers)} workers')
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 1
+        while time.monotonic() < deadline:
+            self.reap()
+            if not self.workers:
+                break
+            time.sleep(0.1)
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        print('✓ Server stopped')
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefork server for the Employee Management API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--single-threaded', action='store_true',
+                        help='handle one request at a time per worker (default: thread per request)')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle a worker after this many requests (0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=0,
+                        help='random extra requests so workers do not recycle together')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='seconds workers get to finish in-flight requests')
+    parser.add_argument('--reuse-port', action='store_true',
+                        help='each worker binds its own SO_REUSEPORT socket (kernel load balancing)')
+    args = parser.parse_args()
+
+    if args.reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error('SO_REUSEPORT is not supported on this platform')
+    if not hasattr(os, 'fork'):
+        parser.error('prefork mode needs os.fork (Linux/macOS)')
+
+    Master(args).start()
+
+if __name__ == '__main__':
+    main()
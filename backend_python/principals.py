@@ -0,0 +1,109 @@
+"""
+Authenticated principal cache
+Maps a verified JWT (by digest) to the user it belongs to so requests skip
+signature verification and the per-route `SELECT role FROM users` lookup.
+Entries are tagged with the users data version they were read at, so any
+user write - seen through the shared counter, from any prefork worker -
+retires them.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class Principal:
+    """The authenticated user for a request"""
+
+    __slots__ = ('id', 'name', 'email', 'role')
+
+    def __init__(self, id, name, email, role):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'email': self.email, 'role': self.role}
+
+class PrincipalCache:
+    """Bounded LRU of token digest -> Principal, each entry capped at the token's exp
+
+    current_version() returns the users data version; an entry cached at an
+    older version is a miss.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60, current_version=lambda: 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.current_version = current_version
+        self._entries = OrderedDict()   # digest -> (principal, expires_at, users version)
+        self._by_user = {}              # user id -> set of digests
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        """Return the cached Principal for a token, or None"""
+        key = self.digest(token)
+        now = time.time()
+        version = self.current_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at, cached_version = entry
+            if expires_at <= now or cached_version != version:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, token, principal, token_exp, version):
+        """Cache a principal until min(now + ttl, token exp) or the next user write
+
+        version is current_version() read before the user row was loaded.
+        """
+        key = self.digest(token)
+        expires_at = min(time.time() + self.ttl, token_exp)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (principal, expires_at, version)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        """Drop every cached token for a user (deleted, role changed, ...)"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key):
+        principal = self._entries.pop(key)[0]
+        keys = self._by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal.id]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,91 @@
+"""
+Per-request profiling
+Runs a single request under cProfile and keeps the resulting stats files
+in a bounded on-disk ring (oldest files are removed first)
+"""
+
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+
+_NAME = re.compile(r'^[\w.-]+\.prof$')
+
+class ProfileStore:
+    """Profiles callables and stores <name>.prof plus a <name>.json summary"""
+
+    def __init__(self, directory, max_files=50, top_functions=15):
+        self.directory = directory
+        self.max_files = max_files
+        self.top_functions = top_functions
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def run(self, fn, label):
+        """Call fn() under the profiler; returns (result, profile name)"""
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        result = profiler.runcall(fn)
+        elapsed = time.perf_counter() - started
+        name = self._save(profiler, label, elapsed)
+        return result, name
+
+    def _save(self, profiler, label, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = re.sub(r'[^\w-]+', '_', label)[:60]
+        name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._seq) % 10000:04d}"
+                f"-{safe_label}-{elapsed * 1000:.0f}ms.prof")
+        path = os.path.join(self.directory, name)
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats('cumulative').print_stats(self.top_functions)
+        with open(path[:-len('.prof')] + '.json', 'w') as f:
+            json.dump({
+                'name': name,
+                'label': label,
+                'duration_ms': round(elapsed * 1000, 3),
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'calls': stats.total_calls,
+                'top': summary.getvalue().splitlines(),
+            }, f)
+        self._trim()
+        return name
+
+    def _trim(self):
+        with self._lock:
+            files = sorted(f for f in os.listdir(self.directory) if _NAME.match(f))
+            for old in files[:max(len(files) - self.max_files, 0)]:
+                for path in (old, old[:-len('.prof')] + '.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, path))
+                    except FileNotFoundError:
+                        pass
+
+    def list(self):
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for f in sorted(os.listdir(self.directory), reverse=True):
+            if not _NAME.match(f):
+                continue
+            try:
+                with open(os.path.join(self.directory, f[:-len('.prof')] + '.json')) as meta:
+                    entries.append(json.load(meta))
+            except (OSError, ValueError):
+                entries.append({'name': f})
+        return entries
+
+    def path(self, name):
+        """Absolute path of a stored profile, or None for unknown/invalid names"""
+        if not _NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
@@ -0,0 +1,295 @@
+"""
+Employee read replica
+In-process copy of the employees table (one tuple per row) with
+department / is_active indexes and lazily built sorted orderings, so list,
+detail and department reads are answered without touching SQLite.
+
+Writes reach the replica through TEMP triggers on every pooled connection:
+they collect the ids a connection changed, and the write route's
+data_versions.bump() re-reads exactly those rows after commit.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+# Sort columns whose SQL sort expression is COALESCE(col, 0); other columns use ''
+NUMERIC_SORT_COLUMNS = ('id', 'salary', 'is_active')
+
+def sql_key(value):
+    """Python sort key matching SQLite's cross-type order (numbers < text < blobs)"""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return (2, value)
+
+def install_change_triggers(conn):
+    """Record ids of employees changed on this connection in conn.changed_employees
+
+    Sets conn.tracks_employees; a connection opened before the employees
+    table exists (first start) is left untracked.
+    """
+    changed = set()
+    conn.changed_employees = changed
+    conn.tracks_employees = False
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employees'").fetchone() is None:
+        return
+    conn.create_function('ems_employee_changed', 1, changed.add, deterministic=False)
+    conn.executescript('''
+        CREATE TEMP TRIGGER IF NOT EXISTS replica_employees_ai AFTER INSERT ON main.employees
+        BEGIN SELECT ems_employee_changed(NEW.id); END;
+        CREATE TEMP TRIGGER IF NOT EXISTS replica_employees_ad AFTER DELETE ON main.employees
+        BEGIN SELECT ems_employee_changed(OLD.id); END;
+        CREATE TEMP TRIGGER IF NOT EXISTS replica_employees_au AFTER UPDATE ON main.employees
+        BEGIN SELECT ems_employee_changed(OLD.id); SELECT ems_employee_changed(NEW.id); END;
+    ''')
+    conn.tracks_employees = True
+
+class EmployeeReplica:
+    """Versioned in-memory read model of the employees table
+
+    The replica is fresh while every version of the 'employees' counter has
+    been applied. A gap (a bump from another worker process, or one without
+    known ids) makes reads fall back to SQLite; if it persists for
+    `reload_after` seconds a background full reload closes it.
+    """
+
+    def __init__(self, connect, current_version, reload_after=0.5):
+        self.connect = connect
+        self.current_version = current_version
+        self.reload_after = reload_after
+        self._lock = threading.RLock()
+        self._reloading = False
+        self._loading_ids = None
+        self._stale_since = None
+
+        self.loaded = False
+        self.columns = ()
+        self._col = {}
+        self._rows = {}            # id -> row tuple
+        self._by_department = {}   # department -> set of ids
+        self._by_active = {}       # is_active -> set of ids
+        self._orderings = {}       # sort column -> sorted [(sql_key, id)]
+        self._synced = 0           # highest contiguous employees version applied
+        self._ahead = set()        # applied versions beyond a gap
+
+        # Stats
+        self.loads = 0
+        self.load_ms = 0.0
+        self.hits = 0
+        self.fallbacks = 0
+
+    # ----- loading -----
+
+    def load(self):
+        """Read the whole table; safe to call while serving"""
+        with self._lock:
+            # Ids written while the snapshot is read are re-read after the swap
+            self._loading_ids = set()
+        version = self.current_version()
+        started = time.perf_counter()
+        conn = self.connect()
+        try:
+            cursor = conn.execute('SELECT * FROM employees')
+            columns = tuple(d[0] for d in cursor.description)
+            rows = {}
+            while True:
+                batch = cursor.fetchmany(5000)
+                if not batch:
+                    break
+                for row in batch:
+                    rows[row[0]] = tuple(row)
+
+            with self._lock:
+                self.columns = columns
+                self._col = {name: i for i, name in enumerate(columns)}
+                self._department = self._col['department']
+                self._active = self._col['is_active']
+                self._rows = rows
+                self._by_department = {}
+                self._by_active = {}
+                for emp_id, row in rows.items():
+                    self._index(emp_id, row)
+                self._orderings = {}
+                written, self._loading_ids = self._loading_ids, None
+                self._refresh_rows(conn, written)
+                self._synced = version
+                self._ahead = {v for v in self._ahead if v > version}
+                self._advance()
+                self._stale_since = None
+                self.loaded = True
+                self.loads += 1
+                self.load_ms = round((time.perf_counter() - started) * 1000, 3)
+        finally:
+            conn.close()
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                print(f'✗ Employee replica reload failed: {e}')
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name='employee-replica-reload', daemon=True).start()
+
+    # ----- write path -----
+
+    def apply(self, conn, ids, version):
+        """Re-read changed ids on conn (after commit) and mark `version` applied"""
+        with self._lock:
+            if self._loading_ids is not None:
+                self._loading_ids.update(ids)
+            if not self.loaded:
+                return
+            # Reads happen under the lock, so racing writers cannot apply out of order
+            self._refresh_rows(conn, ids)
+            if version > self._synced:
+                self._ahead.add(version)
+                self._advance()
+
+    def _refresh_rows(self, conn, ids):
+        id_list = list(ids)
+        for start in range(0, len(id_list), 500):
+            chunk = id_list[start:start + 500]
+            cursor = conn.execute(f"SELECT * FROM employees WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            rows = {row[0]: tuple(row) for row in cursor}
+            for emp_id in chunk:
+                self._remove(emp_id)
+                if emp_id in rows:
+                    self._insert(emp_id, rows[emp_id])
+
+    def _advance(self):
+        while self._synced + 1 in self._ahead:
+            self._synced += 1
+            self._ahead.discard(self._synced)
+
+    def _index(self, emp_id, row):
+        self._by_department.setdefault(row[self._department], set()).add(emp_id)
+        self._by_active.setdefault(row[self._active], set()).add(emp_id)
+
+    def _insert(self, emp_id, row):
+        self._rows[emp_id] = row
+        self._index(emp_id, row)
+        for column, entries in self._orderings.items():
+            insort(entries, (self._sort_key(column, row), emp_id))
+
+    def _remove(self, emp_id):
+        row = self._rows.pop(emp_id, None)
+        if row is None:
+            return
+        self._by_department.get(row[self._department], set()).discard(emp_id)
+        self._by_active.get(row[self._active], set()).discard(emp_id)
+        for column, entries in self._orderings.items():
+            entry = (self._sort_key(column, row), emp_id)
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+
+    # ----- read path -----
+
+    def fresh(self):
+        """True when every employees write is reflected; schedules a reload when not"""
+        current = self.current_version()
+        with self._lock:
+            if self.loaded and current == self._synced:
+                self.hits += 1
+                self._stale_since = None
+                return True
+            self.fallbacks += 1
+            now = time.monotonic()
+            if self._stale_since is None:
+                self._stale_since = now
+            stale_for = now - self._stale_since
+        if not self.loaded or stale_for >= self.reload_after:
+            self._reload_in_background()
+        return False
+
+    @staticmethod
+    def sort_value(column, value):
+        """The value SQL's COALESCE(column, default) gives for a raw column value"""
+        if value is None:
+            return 0 if column in NUMERIC_SORT_COLUMNS else ''
+        return value
+
+    def _sort_key(self, column, row):
+        return sql_key(self.sort_value(column, row[self._col[column]]))
+
+    def _ordering(self, column):
+        entries = self._orderings.get(column)
+        if entries is None:
+            entries = sorted((self._sort_key(column, row), emp_id) for emp_id, row in self._rows.items())
+            self._orderings[column] = entries
+        return entries
+
+    def query(self, department=None, is_active=None, sort_by='created_at', descending=True,
+              after=None, limit=None):
+        """Matching rows as dicts, in the same order as the SQL list query
+
+        after = (sort value, id) from a keyset cursor; limit=None returns all.
+        """
+        with self._lock:
+            candidates = None
+            if department is not None:
+                candidates = self._by_department.get(department, set())
+            if is_active is not None:
+                active = self._by_active.get(is_active, set())
+                candidates = active if candidates is None else candidates & active
+
+            # Walking the full ordering visits ~wanted * rows / matches entries;
+            # for selective filters, sorting just the matches is cheaper
+            wanted = len(candidates) if candidates is not None and limit is None else limit
+            if candidates is not None and \
+                    wanted * len(self._rows) > 4 * len(candidates) * max(len(candidates), 1):
+                entries = sorted((self._sort_key(sort_by, self._rows[i]), i) for i in candidates)
+                candidates = None
+            else:
+                entries = self._ordering(sort_by)
+
+            if descending:
+                stop = bisect_left(entries, (sql_key(after[0]), after[1])) if after else len(entries)
+                positions = range(stop - 1, -1, -1)
+            else:
+                start = bisect_right(entries, (sql_key(after[0]), after[1])) if after else 0
+                positions = range(start, len(entries))
+
+            rows = []
+            for i in positions:
+                emp_id = entries[i][1]
+                if candidates is None or emp_id in candidates:
+                    rows.append(self._rows[emp_id])
+                    if limit is not None and len(rows) == limit:
+                        break
+            columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+    def get(self, emp_id):
+        with self._lock:
+            row = self._rows.get(emp_id)
+            return dict(zip(self.columns, row)) if row is not None else None
+
+    def departments(self):
+        with self._lock:
+            return sorted(dept for dept, ids in self._by_department.items() if dept and ids)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'rows': len(self._rows),
+                'orderings': sorted(self._orderings),
+                'synced_version': self._synced,
+                'current_version': self.current_version(),
+                'loads': self.loads,
+                'last_load_ms': self.load_ms,
+                'reloading': self._reloading,
+                'hits': self.hits,
+                'fallbacks': self.fallbacks,
+            }
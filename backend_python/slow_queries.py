@@ -0,0 +1,116 @@
+"""
+Slow-query log
+Records statements slower than a threshold with their normalized SQL,
+parameter shapes and EXPLAIN QUERY PLAN, aggregated per statement so the
+worst offenders (full scans, temp B-tree sorts) are easy to spot
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+# Statements EXPLAIN QUERY PLAN says something useful about
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def normalize(sql):
+    """Collapse whitespace and replace literals so variants group together"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?, ...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+def param_shape(parameters):
+    """Types (never values) of the bound parameters"""
+    def shape(value):
+        if isinstance(value, (str, bytes)):
+            return f'{type(value).__name__}[{len(value)}]'
+        return type(value).__name__
+    if isinstance(parameters, dict):
+        return {key: shape(value) for key, value in parameters.items()}
+    return [shape(value) for value in parameters or ()]
+
+class SlowQueryLog:
+    """Thread-safe slow statement recorder
+
+    `threshold` is in seconds. Plans are captured once per normalized
+    statement (EXPLAIN QUERY PLAN does not run the query), on the same
+    connection that ran it.
+    """
+
+    def __init__(self, threshold=0.1, max_recent=500, max_statements=1000):
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self._recent = deque(maxlen=max_recent)
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql, parameters, seconds, many=False):
+        normalized = normalize(sql)
+        with self._lock:
+            entry = self._statements.get(normalized)
+            known = entry is not None
+        plan = None if known or many else self._explain(conn, sql, parameters)
+
+        event = {
+            'sql': normalized,
+            'params': '[executemany]' if many else param_shape(parameters),
+            'duration_ms': round(seconds * 1000, 3),
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._lock:
+            self._recent.append(event)
+            entry = self._statements.get(normalized)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    return
+                entry = self._statements[normalized] = {
+                    'sql': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'params': event['params'], 'plan': plan,
+                    'full_scan': False, 'temp_btree': False,
+                }
+                if plan:
+                    entry['full_scan'] = any(step.startswith('SCAN') and 'USING' not in step
+                                             and 'VIRTUAL TABLE' not in step for step in plan)
+                    entry['temp_btree'] = any('USE TEMP B-TREE' in step for step in plan)
+            entry['count'] += 1
+            entry['total_ms'] += event['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], event['duration_ms'])
+            entry['last_at'] = event['at']
+        if not known:
+            print(f"⚠ Slow query ({event['duration_ms']} ms): {normalized[:200]}")
+
+    @staticmethod
+    def _explain(conn, sql, parameters):
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        try:
+            # Plain cursor: must not re-enter the instrumented one
+            cursor = sqlite3.Cursor(conn)
+            return [row[3] for row in cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)]
+        except sqlite3.Error as e:
+            return [f'EXPLAIN failed: {e}']
+
+    def top(self, limit=20, sort='total'):
+        key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}.get(sort, 'total_ms')
+        with self._lock:
+            entries = [dict(entry, total_ms=round(entry['total_ms'], 3),
+                            avg_ms=round(entry['total_ms'] / entry['count'], 3))
+                       for entry in self._statements.values()]
+        entries.sort(key=lambda entry: entry[key], reverse=True)
+        return entries[:limit]
+
+    def recent(self, limit=50):
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._statements.clear()
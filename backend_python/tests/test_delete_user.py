@@ -0,0 +1,108 @@
+"""
+Regression: deleting a user that has audit rows (password_logs written on
+register / create, login_attempts, archived employees) must not fail on
+foreign keys, the audit rows must survive with the reference cleared, and
+log maintenance must still roll them up afterwards
+"""
+
+import os
+import sys
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix='ems-test-')
+os.environ['EMS_DB_PATH'] = os.path.join(DATA_DIR, 'database.db')
+os.environ['EMS_HASH_WORKERS'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import app as ems
+
+@pytest.fixture(scope='module')
+def client():
+    ems.init_db()
+    return ems.app.test_client()
+
+def login(client, email, password):
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+def audit_rows(user_id):
+    conn = ems.get_db()
+    try:
+        return {
+            'password_logs': conn.execute('SELECT COUNT(*) FROM password_logs WHERE user_id = ?',
+                                          (user_id,)).fetchone()[0],
+            'orphaned': conn.execute('SELECT COUNT(*) FROM password_logs WHERE user_id IS NULL').fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+def test_delete_registered_user(client):
+    admin = login(client, 'admin@company.com', 'admin123')
+    response = client.post('/api/auth/register',
+                           json={'name': 'Reg User', 'email': 'reg@example.com', 'password': 'secret123'})
+    assert response.status_code == 201, response.get_json()
+    user_id = response.get_json()['user']['id']
+    login(client, 'reg@example.com', 'secret123')
+    ems.audit_writer.flush()
+    assert audit_rows(user_id)['password_logs'] > 0
+
+    response = client.delete(f'/api/users/{user_id}', headers=admin)
+    assert response.status_code == 200, response.get_json()
+    assert audit_rows(user_id)['password_logs'] == 0
+    assert audit_rows(user_id)['orphaned'] > 0
+
+def test_delete_admin_created_user_with_archived_employees(client):
+    admin = login(client, 'admin@company.com', 'admin123')
+    response = client.post('/api/users', headers=admin,
+                           json={'name': 'Second Admin', 'email': 'admin2@example.com',
+                                 'password': 'secret123', 'role': 'admin'})
+    assert response.status_code == 201, response.get_json()
+    user_id = response.get_json()['id']
+
+    # The new admin archives an employee, and the delete runs with its audit rows still queued
+    other = login(client, 'admin2@example.com', 'secret123')
+    employee = client.post('/api/employees', headers=other,
+                           json={'first_name': 'Arch', 'last_name': 'Ived', 'email': 'arch@example.com'})
+    assert client.delete(f"/api/employees/{employee.get_json()['id']}", headers=other).status_code == 200
+
+    response = client.delete(f'/api/users/{user_id}', headers=admin)
+    assert response.status_code == 200, response.get_json()
+    conn = ems.get_db()
+    try:
+        row = conn.execute('SELECT deleted_by_user_id, deleted_by_name FROM deleted_employees WHERE email = ?',
+                           ('arch@example.com',)).fetchone()
+    finally:
+        conn.close()
+    assert row['deleted_by_user_id'] is None
+    assert row['deleted_by_name'] == 'Second Admin'
+
+def test_log_maintenance_after_delete(client):
+    admin = login(client, 'admin@company.com', 'admin123')
+    response = client.post('/api/auth/register',
+                           json={'name': 'Old User', 'email': 'old@example.com', 'password': 'secret123'})
+    assert response.status_code == 201, response.get_json()
+    user_id = response.get_json()['user']['id']
+    ems.audit_writer.flush()
+
+    # Age the user's audit rows past retention so maintenance rolls them up after the delete
+    conn = ems.get_db()
+    try:
+        conn.execute("UPDATE password_logs SET timestamp = datetime('now', '-2 years') WHERE user_id = ?",
+                     (user_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    assert client.delete(f'/api/users/{user_id}', headers=admin).status_code == 200
+
+    conn = ems.get_db()
+    try:
+        report = ems.run_log_maintenance(conn)
+        assert report['password_logs']['expired']
+        assert conn.execute('SELECT COUNT(*) FROM password_logs_daily WHERE user_id = 0').fetchone()[0] > 0
+        # A second run over the (now empty) expired months still succeeds
+        ems.run_log_maintenance(conn)
+    finally:
+        conn.close()
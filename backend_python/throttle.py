@@ -0,0 +1,253 @@
+"""
+Login throttling
+Sharded in-memory sliding-window failure tracker with lockout, keyed by
+email and by client IP, so login lockout decisions need no database access.
+Under prefork the state moves into shared memory (LoginThrottle.share), so
+every worker counts against the same limits.
+"""
+
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+
+class ThrottleState:
+    __slots__ = ('failures', 'locked_until')
+
+    def __init__(self):
+        self.failures = deque()
+        self.locked_until = 0.0
+
+class SharedThrottleTable:
+    """Fixed-size throttle state in fork-inherited shared memory
+
+    Keys hash to a bucket of `ways` slots; a full bucket reuses its least
+    recently active slot, which bounds memory like max_keys_per_shard does.
+    A slot keeps its last `depth` failure times in a ring, which is enough to
+    tell whether `limit <= depth` failures fall inside the window.
+    Times come from time.monotonic(), which is system-wide on Linux/macOS.
+    """
+
+    def __init__(self, buckets, ways, depth, stripes=16):
+        ctx = multiprocessing.get_context('fork')
+        slots = buckets * ways
+        self.buckets = buckets
+        self.ways = ways
+        self.depth = depth
+        self._keys = ctx.RawArray('Q', slots)            # 0 = free
+        self._locked_until = ctx.RawArray('d', slots)
+        self._active = ctx.RawArray('d', slots)          # last touched
+        self._head = ctx.RawArray('i', slots)
+        self._failures = ctx.RawArray('d', slots * depth)
+        self._locks = [ctx.Lock() for _ in range(stripes)]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def lock_for(self, key):
+        """(lock, bucket, key hash) for a key"""
+        hashed = self._hash(key)
+        bucket = hashed % self.buckets
+        return self._locks[bucket % len(self._locks)], bucket, hashed
+
+    def find(self, bucket, hashed, now, create=False):
+        """Slot index of a key (caller holds its lock), or None"""
+        first = bucket * self.ways
+        free = oldest = None
+        for slot in range(first, first + self.ways):
+            if self._keys[slot] == hashed:
+                self._active[slot] = now
+                return slot
+            if self._keys[slot] == 0:
+                if free is None:
+                    free = slot
+            elif oldest is None or self._active[slot] < self._active[oldest]:
+                oldest = slot
+        victim = free if free is not None else oldest
+        if not create:
+            return None
+        self.clear(victim)
+        self._keys[victim] = hashed
+        self._active[victim] = now
+        return victim
+
+    def clear(self, slot):
+        self._keys[slot] = 0
+        self._locked_until[slot] = 0.0
+        self._active[slot] = 0.0
+        self._clear_failures(slot)
+
+    def _clear_failures(self, slot):
+        self._head[slot] = 0
+        start = slot * self.depth
+        for i in range(start, start + self.depth):
+            self._failures[i] = 0.0
+
+    def failures(self, slot, since):
+        """Failures recorded after `since` (0.0 marks an unused ring entry)"""
+        since = max(since, 0.0)
+        start = slot * self.depth
+        return sum(1 for i in range(start, start + self.depth) if self._failures[i] > since)
+
+    def expire_lockout(self, slot, now):
+        """Lock expiry of a slot; a finished lockout clears its failures"""
+        locked_until = self._locked_until[slot]
+        if locked_until and locked_until <= now:
+            self._locked_until[slot] = 0.0
+            self._clear_failures(slot)
+        return self._locked_until[slot]
+
+    def add_failure(self, slot, now):
+        head = self._head[slot]
+        self._failures[slot * self.depth + head] = now
+        self._head[slot] = (head + 1) % self.depth
+
+    def lock(self, slot, until):
+        self._locked_until[slot] = until
+
+    def stats(self, now):
+        tracked = sum(1 for key in self._keys if key)
+        locked = sum(1 for until in self._locked_until if until > now)
+        return {'tracked_keys': tracked, 'locked_keys': locked, 'shared': True}
+
+class LoginThrottle:
+    """Failed-login tracker
+
+    A key is locked for `lockout` seconds once it collects `max_failures`
+    failures inside `window` seconds. Lockout expiry clears its failures.
+    """
+
+    def __init__(self, max_failures=5, lockout=30, window=900, ip_max_failures=20,
+                 shards=16, max_keys_per_shard=10000):
+        self.max_failures = max_failures
+        self.ip_max_failures = ip_max_failures
+        self.lockout = lockout
+        self.window = window
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        self._shared = None
+
+    def share(self, buckets=4096, ways=8):
+        """Move throttle state into fork-inherited shared memory (call before forking)
+
+        Holds buckets * ways keys (~6 MB at the defaults); state collected so
+        far in this process is not carried over.
+        """
+        self._shared = SharedThrottleTable(buckets, ways, max(self.max_failures, self.ip_max_failures))
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _limit(self, key):
+        return self.ip_max_failures if key.startswith('ip:') else self.max_failures
+
+    def _state(self, entries, key, now, create=False):
+        """Look up a key's state, expiring stale failures and finished lockouts"""
+        state = entries.get(key)
+        if state is None:
+            if not create:
+                return None
+            state = entries[key] = ThrottleState()
+            # Bound memory: forget the least recently touched keys
+            while len(entries) > self.max_keys_per_shard:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+
+        if state.locked_until and state.locked_until <= now:
+            state.locked_until = 0.0
+            state.failures.clear()
+        while state.failures and state.failures[0] <= now - self.window:
+            state.failures.popleft()
+        return state
+
+    def locked_for(self, email, ip):
+        """Seconds remaining on the longest active lockout for this email or IP (0 if none)"""
+        now = time.monotonic()
+        if self._shared is not None:
+            return self._shared_locked_for(email, ip, now)
+        remaining = 0.0
+        for key in (f'email:{email.lower()}', f'ip:{ip}'):
+            lock, entries = self._shard(key)
+            with lock:
+                state = self._state(entries, key, now)
+                if state and state.locked_until:
+                    remaining = max(remaining, state.locked_until - now)
+        return remaining
+
+    def record_failure(self, email, ip):
+        """Count a failed attempt; returns (email failure count, locked)"""
+        now = time.monotonic()
+        if self._shared is not None:
+            return self._shared_record_failure(email, ip, now)
+        email_failures = 0
+        locked = False
+        for key in (f'email:{email.lower()}', f'ip:{ip}'):
+            lock, entries = self._shard(key)
+            with lock:
+                state = self._state(entries, key, now, create=True)
+                state.failures.append(now)
+                if len(state.failures) >= self._limit(key):
+                    state.locked_until = now + self.lockout
+                    locked = True
+                if key.startswith('email:'):
+                    email_failures = len(state.failures)
+        return email_failures, locked
+
+    def reset(self, email):
+        """Clear failures for an email after a successful login"""
+        key = f'email:{email.lower()}'
+        if self._shared is not None:
+            lock, bucket, hashed = self._shared.lock_for(key)
+            with lock:
+                slot = self._shared.find(bucket, hashed, time.monotonic())
+                if slot is not None:
+                    self._shared.clear(slot)
+            return
+        lock, entries = self._shard(key)
+        with lock:
+            entries.pop(key, None)
+
+    # ----- shared (prefork) state -----
+
+    def _shared_locked_for(self, email, ip, now):
+        remaining = 0.0
+        for key in (f'email:{email.lower()}', f'ip:{ip}'):
+            lock, bucket, hashed = self._shared.lock_for(key)
+            with lock:
+                slot = self._shared.find(bucket, hashed, now)
+                if slot is not None:
+                    locked_until = self._shared.expire_lockout(slot, now)
+                    if locked_until:
+                        remaining = max(remaining, locked_until - now)
+        return remaining
+
+    def _shared_record_failure(self, email, ip, now):
+        email_failures = 0
+        locked = False
+        for key in (f'email:{email.lower()}', f'ip:{ip}'):
+            lock, bucket, hashed = self._shared.lock_for(key)
+            with lock:
+                slot = self._shared.find(bucket, hashed, now, create=True)
+                self._shared.expire_lockout(slot, now)
+                self._shared.add_failure(slot, now)
+                failures = self._shared.failures(slot, now - self.window)
+                if failures >= self._limit(key):
+                    self._shared.lock(slot, now + self.lockout)
+                    locked = True
+                if key.startswith('email:'):
+                    email_failures = failures
+        return email_failures, locked
+
+    def stats(self):
+        tracked = locked = 0
+        now = time.monotonic()
+        if self._shared is not None:
+            return self._shared.stats(now)
+        for lock, entries in self._shards:
+            with lock:
+                tracked += len(entries)
+                locked += sum(1 for state in entries.values() if state.locked_until > now)
+        return {'tracked_keys': tracked, 'locked_keys': locked}
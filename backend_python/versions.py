@@ -0,0 +1,90 @@
+"""
+Data version counters
+Per-table counters bumped by write routes; read endpoints derive strong
+ETags and Last-Modified headers from them so unchanged polls get a 304
+without touching the database
+"""
+
+import multiprocessing
+import threading
+import uuid
+from datetime import datetime, timezone
+
+class DataVersions:
+    """In-process version counter per table
+
+    The ETag includes a random per-process epoch, so a tag issued before a
+    restart (or by another worker process) never matches by accident.
+
+    After share() the listed tables live in shared memory: worker processes
+    forked afterwards keep the parent's epoch and see each other's bumps.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._started = datetime.now(timezone.utc).replace(microsecond=0)
+        self._versions = {}
+        self._modified = {}
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Call listener({table: new version}) after every bump, outside the lock"""
+        self._listeners.append(listener)
+
+    def share(self, tables):
+        """Move counters for `tables` into fork-inherited shared memory (call before forking)"""
+        ctx = multiprocessing.get_context('fork')
+        with self._lock:
+            self._slots = {table: i for i, table in enumerate(tables)}
+            self._shared_versions = ctx.RawArray('q', [self._versions.get(t, 0) for t in tables])
+            self._shared_modified = ctx.RawArray('d', [self._modified[t].timestamp() if t in self._modified else 0.0
+                                                       for t in tables])
+            self._lock = ctx.Lock()
+
+    def bump(self, *tables):
+        """Record a committed write to one or more tables"""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        changes = {}
+        with self._lock:
+            for table in tables:
+                slot = self._slots.get(table)
+                if slot is None:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+                    self._modified[table] = now
+                    changes[table] = self._versions[table]
+                else:
+                    self._shared_versions[slot] += 1
+                    self._shared_modified[slot] = now.timestamp()
+                    changes[table] = self._shared_versions[slot]
+        for listener in self._listeners:
+            listener(changes)
+
+    def _version(self, table):
+        slot = self._slots.get(table)
+        if slot is None:
+            return self._versions.get(table, 0)
+        return self._shared_versions[slot]
+
+    def _last_modified(self, table):
+        slot = self._slots.get(table)
+        if slot is None:
+            return self._modified.get(table, self._started)
+        stamp = self._shared_modified[slot]
+        return datetime.fromtimestamp(stamp, timezone.utc) if stamp else self._started
+
+    def version(self, table):
+        with self._lock:
+            return self._version(table)
+
+    def etag(self, *tables):
+        """Unquoted strong ETag value covering the given tables"""
+        with self._lock:
+            parts = [str(self._version(table)) for table in tables]
+        return f"{self.epoch}-{'.'.join(parts)}"
+
+    def last_modified(self, *tables):
+        """Most recent write time across tables (process start if never written)"""
+        with self._lock:
+            return max((self._last_modified(table) for table in tables), default=self._started)
@@ -1,51 +1,265 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server to serve the frontend on localhost:8000
-Run with: python3 server.py
+HTTP server to serve the frontend on localhost:8888
+Run with: python3 server.py          (default: threaded, cached, compressed, ETag/304)
+          python3 server.py --dev    (no caching, like the old server)
 """
 
+import argparse
+import email.utils
+import gzip
 import http.server
-import socketserver
+import mimetypes
 import os
+import socketserver
 import sys
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
 
 PORT = 8888
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
+CACHE_MAX_FILE = 1024 * 1024          # larger files are streamed with sendfile
+CACHE_MAX_BYTES = 64 * 1024 * 1024    # total bytes held in the memory cache
+ASSET_MAX_AGE = 86400                 # seconds browsers may reuse images/fonts unchecked
+LONG_CACHE_TYPES = ('image/', 'font/', 'application/font-', 'application/vnd.ms-fontobject')
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS = 512
+
+class CachedFile:
+    """File body plus compressed variants, valid while mtime/size match"""
+
+    __slots__ = ('mtime_ns', 'size', 'etag_base', 'last_modified', 'content_type', 'variants', 'nbytes')
+
+    def __init__(self, path, st):
+        self.mtime_ns = st.st_mtime_ns
+        self.size = st.st_size
+        self.etag_base = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+        self.last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.variants = {None: body}
+
+        if self.content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_COMPRESS:
+            # Precompressed files on disk win; otherwise compress once here
+            for encoding, suffix, compress in (('br', '.br', brotli and brotli.compress),
+                                               ('gzip', '.gz', lambda b: gzip.compress(b, 9))):
+                sidecar = path + suffix
+                if os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns >= st.st_mtime_ns:
+                    with open(sidecar, 'rb') as f:
+                        self.variants[encoding] = f.read()
+                elif compress:
+                    self.variants[encoding] = compress(body)
+        self.nbytes = sum(len(v) for v in self.variants.values())
+
+    def fresh(self, st):
+        return st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+class FileCache:
+    """LRU of CachedFile keyed by path, bounded by total bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, st):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.fresh(st):
+                self._entries.move_to_end(path)
+                return entry
+        entry = CachedFile(path, st)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[path] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+        return entry
+
+file_cache = FileCache()
+
+def accepted_encodings(header):
+    """Encodings the client accepts (ignores q-values other than q=0)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=DIRECTORY, **kwargs)
-    
+
     def end_headers(self):
         # Add headers to prevent caching during development
         self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
         self.send_header('Expires', '0')
         super().end_headers()
 
+class ProductionRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves files from the memory cache with validators and compression"""
+
+    protocol_version = 'HTTP/1.1'
+    max_age = ASSET_MAX_AGE
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=DIRECTORY, **kwargs)
+
+    def do_GET(self):
+        self.serve(head=False)
+
+    def do_HEAD(self):
+        self.serve(head=True)
+
+    def serve(self, head):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split('?', 1)[0].endswith('/'):
+                # Let the stock handler issue the trailing-slash redirect
+                return super().do_GET() if not head else super().do_HEAD()
+            index = os.path.join(path, 'index.html')
+            if not os.path.isfile(index):
+                return super().do_GET() if not head else super().do_HEAD()
+            path = index
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+        if not os.path.isfile(path):
+            self.send_error(404, 'File not found')
+            return
+
+        if st.st_size > CACHE_MAX_FILE:
+            return self.serve_large(path, st, head)
+
+        entry = file_cache.get(path, st)
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        encoding = next((e for e in ('br', 'gzip') if e in accepted and e in entry.variants), None)
+        etag = f'"{entry.etag_base}-{encoding}"' if encoding else f'"{entry.etag_base}"'
+
+        not_modified = self.not_modified(etag, st.st_mtime)
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Cache-Control', self.cache_control(entry.content_type))
+        if len(entry.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+        if not_modified:
+            self.end_headers()
+            return
+        body = entry.variants[encoding]
+        self.send_header('Content-Type', entry.content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def serve_large(self, path, st, head):
+        """Uncached file: validators, then zero-copy sendfile for the body"""
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        not_modified = self.not_modified(etag, st.st_mtime)
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True))
+        content_type = self.guess_type(path)
+        self.send_header('Cache-Control', self.cache_control(content_type))
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(st.st_size))
+        self.end_headers()
+        if head:
+            return
+        self.wfile.flush()
+        with open(path, 'rb') as f:
+            self.connection.sendfile(f)
+
+    def not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [t.strip().removeprefix('W/') for t in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def cache_control(self, content_type):
+        # Asset URLs carry no content hash, so HTML/JS/CSS are always
+        # revalidated (a 304 without a body): stale scripts would run against
+        # a changed API. Images and fonts cannot break anything when stale.
+        if content_type.startswith(LONG_CACHE_TYPES):
+            return f'public, max-age={self.max_age}'
+        return 'no-cache'
+
+class ThreadingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def make_server(port, dev):
+    if dev:
+        return socketserver.TCPServer(("", port), MyHTTPRequestHandler)
+    return ThreadingServer(("", port), ProductionRequestHandler)
+
+def run(port, dev):
+    with make_server(port, dev) as httpd:
+        print(f"✓ Frontend server running on http://localhost:{port}"
+              f" ({'development, no caching' if dev else 'production'})")
+        print(f"✓ Serving files from: {DIRECTORY}")
+        print(f"✓ Backend API: http://localhost:5002/api")
+        print(f"\nOpen in browser: http://localhost:{port}")
+        print("Press Ctrl+C to stop")
+        httpd.serve_forever()
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Frontend static file server')
+    parser.add_argument('--dev', action='store_true',
+                        help='single-threaded, no-store on every response (old behaviour)')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-age', type=int, default=ASSET_MAX_AGE,
+                        help='Cache-Control max-age for images and fonts (seconds)')
+    args = parser.parse_args()
+    ProductionRequestHandler.max_age = args.max_age
+
     try:
-        with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
-            print(f"✓ Frontend server running on http://localhost:{PORT}")
-            print(f"✓ Serving files from: {DIRECTORY}")
-            print(f"✓ Backend API: http://localhost:5002/api")
-            print(f"\nOpen in browser: http://localhost:{PORT}")
-            print("Press Ctrl+C to stop")
-            httpd.serve_forever()
+        run(args.port, args.dev)
     except KeyboardInterrupt:
         print("\n✓ Server stopped")
         sys.exit(0)
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"✗ Port {PORT} is already in use")
+            print(f"✗ Port {args.port} is already in use")
             # Try alternate port
             for alt_port in [9000, 9001, 9002]:
                 try:
                     print(f"\nTrying alternate port {alt_port}...")
-                    with socketserver.TCPServer(("", alt_port), MyHTTPRequestHandler) as httpd:
-                        print(f"✓ Frontend server running on http://localhost:{alt_port}")
-                        print(f"✓ Backend API: http://localhost:5002/api")
-                        httpd.serve_forever()
+                    run(alt_port, args.dev)
                 except OSError:
                     continue
+                except KeyboardInterrupt:
+                    print("\n✓ Server stopped")
+                    sys.exit(0)
             sys.exit(1)
         raise
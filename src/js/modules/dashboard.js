@@ -8,6 +8,7 @@ class DashboardModule {
         this.employeeModule = employeeModule;
         this.userModule = userModule;
         this.logsModule = logsModule;
+        this.changeStream = null;
     }
     
     show() {
@@ -42,6 +43,28 @@ class DashboardModule {
             document.getElementById('login-log-container').classList.add('hidden');
             document.getElementById('deleted-employees-container').classList.add('hidden');
         }
+        
+        this.startChangeStream(currentUser);
+    }
+    
+    startChangeStream(currentUser) {
+        this.stopChangeStream();
+        if (typeof EventSource === 'undefined') {
+            return;
+        }
+        this.changeStream = this.db.subscribeChanges(change => {
+            this.employeeModule.applyChange(change);
+            if (currentUser.role === 'admin' && change.type !== 'created' && change.type !== 'updated') {
+                this.logsModule.loadDeletedEmployees();
+            }
+        });
+    }
+    
+    stopChangeStream() {
+        if (this.changeStream) {
+            this.changeStream.close();
+            this.changeStream = null;
+        }
     }
     
     showAuth() {
@@ -52,6 +75,7 @@ class DashboardModule {
     
     logout() {
         if (confirm('Are you sure you want to logout?')) {
+            this.stopChangeStream();
             this.db.clearCurrentUser();
             this.showAuth();
         }
@@ -149,7 +149,7 @@ class Database {
         const query = params.toString() ? `?${params.toString()}` : '';
         return this.request(`/employees${query}`);
     }
-    
+
     async getEmployeeById(id) {
         return this.request(`/employees/${id}`);
     }
@@ -214,6 +214,65 @@ class Database {
         });
     }
     
+    // ============ Change Stream ============
+    async getStreamTicket() {
+        return this.request('/stream/ticket', {
+            method: 'POST'
+        });
+    }
+    
+    /**
+     * Subscribe to employee change events (Server-Sent Events)
+     * EventSource cannot send headers, so the stream is opened with a
+     * short-lived ticket instead of the bearer token. The browser retries
+     * dropped connections itself; once the ticket has expired that fails,
+     * so a new ticket is fetched and the stream resumes from the last event.
+     * Returns a handle with close().
+     */
+    subscribeChanges(onChange) {
+        const handle = { source: null, lastEventId: null, closed: false, timer: null };
+        
+        const connect = async () => {
+            let ticket;
+            try {
+                ticket = (await this.getStreamTicket()).ticket;
+            } catch (error) {
+                handle.timer = setTimeout(connect, 5000);
+                return;
+            }
+            if (handle.closed) {
+                return;
+            }
+            let url = `${this.apiURL}/stream/changes?ticket=${encodeURIComponent(ticket)}`;
+            if (handle.lastEventId) {
+                url += `&lastEventId=${encodeURIComponent(handle.lastEventId)}`;
+            }
+            const source = new EventSource(url);
+            ['created', 'updated', 'archived', 'restored', 'reset'].forEach(type => {
+                source.addEventListener(type, (e) => {
+                    handle.lastEventId = e.lastEventId;
+                    onChange(JSON.parse(e.data));
+                });
+            });
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED && !handle.closed) {
+                    handle.timer = setTimeout(connect, 3000);
+                }
+            };
+            handle.source = source;
+        };
+        
+        handle.close = () => {
+            handle.closed = true;
+            clearTimeout(handle.timer);
+            if (handle.source) {
+                handle.source.close();
+            }
+        };
+        connect();
+        return handle;
+    }
+    
     // ============ User Management ============
     
     setCurrentUser(user) {
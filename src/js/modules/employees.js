@@ -49,6 +49,15 @@ class EmployeeModule {
             });
     }
     
+    /**
+     * React to a change event from the server (another tab or user).
+     * Events arrive in bursts, so they are coalesced into one reload.
+     */
+    applyChange(change) {
+        clearTimeout(this.reloadTimer);
+        this.reloadTimer = setTimeout(() => this.loadEmployees(), change.type === 'reset' ? 0 : 250);
+    }
+    
     openModal(employeeId = null) {
         const modal = document.getElementById('employee-modal');
         const form = document.getElementById('employee-form');
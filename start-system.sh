@@ -21,15 +21,21 @@ source .venv/bin/activate 2>/dev/null || {
 
 # Kill any existing processes
 pkill -9 -f "backend_python/app.py" 2>/dev/null
+pkill -9 -f "backend_python/prefork.py" 2>/dev/null
 pkill -9 -f "server.py" 2>/dev/null
 sleep 1
 
-# Start backend API
-echo "Starting Backend API (port 5002)..."
-python backend_python/app.py > /tmp/backend.log 2>&1 &
+# Start backend API (prefork workers; EMS_WORKERS=1 for the single-process dev server)
+EMS_WORKERS=${EMS_WORKERS:-2}
+echo "Starting Backend API (port 5002, $EMS_WORKERS workers)..."
+if [ "$EMS_WORKERS" -gt 1 ]; then
+    python backend_python/prefork.py --workers "$EMS_WORKERS" --port 5002 > /tmp/backend.log 2>&1 &
+else
+    python backend_python/app.py > /tmp/backend.log 2>&1 &
+fi
 sleep 2
 
-# Start frontend server
+# Start frontend server (threaded, compressed, ETag revalidation; --dev disables caching)
 echo "Starting Frontend Server (port 8888)..."
 python server.py > /tmp/frontend.log 2>&1 &
 sleep 2
@@ -46,6 +52,6 @@ echo "   Email: admin@company.com"
 echo "   Password: admin123"
 echo ""
 echo "🛑 To stop: Press Ctrl+C or run:"
-echo "   pkill -f 'backend_python/app.py'"
+echo "   pkill -f 'backend_python/prefork.py'   (or 'backend_python/app.py')"
 echo "   pkill -f 'server.py'"
 echo ""